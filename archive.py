@@ -0,0 +1,340 @@
+import json
+import lzma
+import struct
+import zlib
+from argparse import ArgumentParser
+from collections.abc import Iterator
+from pathlib import Path
+from time import perf_counter
+from typing import Any, BinaryIO, Literal
+
+from type_classes import Card, CardData, CardInfo, Corpus
+
+type Compression = Literal['zlib', 'lzma']
+
+MAGIC = b'MCBA'
+VERSION = 1
+HEADER = struct.Struct('<4sBB')
+TRAILER = struct.Struct('<QQ4s')
+COMPRESSIONS: tuple[Compression, ...] = ('zlib', 'lzma')
+
+INFO_KEYS = (
+    'user_id',
+    'id',
+    'card_id',
+    'face',
+    'tags',
+    'card_edition',
+    'search_card_name',
+    'visual_type',
+    'image_url',
+    'category',
+    'nsfw',
+    'user_name',
+    'email',
+    'artist_name',
+    'status',
+    'likes',
+    'dislikes',
+    'prints_regular',
+    'pp_id',
+)
+INTERNED_INFO = frozenset(
+    {
+        'user_id',
+        'face',
+        'visual_type',
+        'category',
+        'nsfw',
+        'user_name',
+        'email',
+        'artist_name',
+        'status',
+        'dislikes',
+        'prints_regular',
+        'pp_id',
+    }
+)
+DATA_INFO_KEYS = ('artist', 'language', 'number', 'rarity', 'set', 'year')
+INTERNED_DATA_INFO = frozenset({'artist', 'language', 'rarity', 'set', 'year'})
+
+
+class StringTable:
+    strings: list[str]
+    indices: dict[str, int]
+
+    def __init__(self, strings: list[str] | None = None) -> None:
+        self.strings = strings or []
+        self.indices = {string: i for i, string in enumerate(self.strings)}
+
+    def encode(self, value: str | None) -> int | None:
+        if value is None:
+            return None
+        if value not in self.indices:
+            self.indices[value] = len(self.strings)
+            self.strings.append(value)
+        return self.indices[value]
+
+    def decode(self, value: int | None) -> Any:
+        return None if value is None else self.strings[value]
+
+
+def encode_card(card: Card, table: StringTable) -> list[Any]:
+    info: Any = card['info']
+    data = card['data']
+
+    if tuple(info) == INFO_KEYS:
+        encoded_info: Any = [
+            table.encode(info[key]) if key in INTERNED_INFO else info[key]
+            for key in INFO_KEYS
+        ]
+    else:
+        encoded_info = dict(info)
+
+    data_info: Any = data['info']
+    if tuple(data_info) == DATA_INFO_KEYS:
+        encoded_data_info: Any = [
+            (
+                table.encode(data_info[key])
+                if key in INTERNED_DATA_INFO
+                else data_info[key]
+            )
+            for key in DATA_INFO_KEYS
+        ]
+    else:
+        encoded_data_info = dict(data_info)
+
+    return [
+        encoded_info,
+        [
+            value
+            for frame in data['frames']
+            for value in (
+                table.encode(frame['category']),
+                table.encode(frame['name']),
+                table.encode(frame['src']),
+            )
+        ],
+        encoded_data_info,
+        data['planeswalker'],
+        data['saga'],
+        table.encode(data['set_symbol']),
+        [
+            value
+            for field, settings in data['text'].items()
+            for value in (
+                table.encode(field),
+                table.encode(settings['name']),
+                settings['text'],
+            )
+        ],
+        table.encode(data['version']),
+    ]
+
+
+def decode_card(encoded: list[Any], table: StringTable) -> Card:
+    (
+        encoded_info,
+        frames,
+        encoded_data_info,
+        planeswalker,
+        saga,
+        set_symbol,
+        texts,
+        version,
+    ) = encoded
+
+    if isinstance(encoded_info, dict):
+        info: Any = encoded_info
+    else:
+        info = {
+            key: table.decode(value) if key in INTERNED_INFO else value
+            for key, value in zip(INFO_KEYS, encoded_info)
+        }
+
+    if isinstance(encoded_data_info, dict):
+        data_info: Any = encoded_data_info
+    else:
+        data_info = {
+            key: table.decode(value) if key in INTERNED_DATA_INFO else value
+            for key, value in zip(DATA_INFO_KEYS, encoded_data_info)
+        }
+
+    data: CardData = {
+        'frames': [
+            {
+                'category': table.decode(frames[i]),
+                'name': table.decode(frames[i + 1]),
+                'src': table.decode(frames[i + 2]),
+            }
+            for i in range(0, len(frames), 3)
+        ],
+        'info': data_info,
+        'planeswalker': planeswalker,
+        'saga': saga,
+        'set_symbol': table.decode(set_symbol),
+        'text': {
+            table.decode(texts[i]): {
+                'name': table.decode(texts[i + 1]),
+                'text': texts[i + 2],
+            }
+            for i in range(0, len(texts), 3)
+        },
+        'version': table.decode(version),
+    }
+    card_info: CardInfo = info
+    return {'info': card_info, 'data': data}
+
+
+def compress(data: bytes, compression: Compression) -> bytes:
+    if compression == 'lzma':
+        return lzma.compress(data, preset=6)
+    return zlib.compress(data, 9)
+
+
+def decompress(data: bytes, compression: Compression) -> bytes:
+    if compression == 'lzma':
+        return lzma.decompress(data)
+    return zlib.decompress(data)
+
+
+def dump_block(value: Any, compression: Compression) -> bytes:
+    return compress(
+        json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+        compression,
+    )
+
+
+def save_archive(
+    users: Corpus, path: str | Path, compression: Compression = 'zlib'
+) -> None:
+    table = StringTable()
+    encoded_users = [
+        (
+            user_id,
+            [[card_id, encode_card(card, table)] for card_id, card in cards.items()],
+        )
+        for user_id, cards in users.items()
+    ]
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, COMPRESSIONS.index(compression)))
+
+        index: list[tuple[str, int, int]] = []
+        for user_id, encoded_cards in encoded_users:
+            block = dump_block(encoded_cards, compression)
+            index.append((user_id, file.tell(), len(block)))
+            file.write(block)
+
+        index_offset = file.tell()
+        index_block = dump_block(
+            {'strings': table.strings, 'users': index}, compression
+        )
+        file.write(index_block)
+        file.write(TRAILER.pack(index_offset, len(index_block), MAGIC))
+
+
+class CardArchive:
+    file: BinaryIO
+    compression: Compression
+    table: StringTable
+    blocks: dict[str, tuple[int, int]]
+
+    def __init__(self, path: str | Path) -> None:
+        self.file = open(path, 'rb')
+
+        magic, version, compression = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            self.file.close()
+            raise ValueError(f'{path} is not a version {VERSION} card archive')
+        self.compression = COMPRESSIONS[compression]
+
+        self.file.seek(-TRAILER.size, 2)
+        index_offset, index_length, magic = TRAILER.unpack(self.file.read(TRAILER.size))
+        if magic != MAGIC:
+            self.file.close()
+            raise ValueError(f'{path} is truncated')
+
+        index = self.read_block(index_offset, index_length)
+        self.table = StringTable(index['strings'])
+        self.blocks = {
+            user_id: (offset, length) for user_id, offset, length in index['users']
+        }
+
+    def __enter__(self) -> 'CardArchive':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def read_block(self, offset: int, length: int) -> Any:
+        self.file.seek(offset)
+        return json.loads(decompress(self.file.read(length), self.compression))
+
+    def user_ids(self) -> list[str]:
+        return list(self.blocks)
+
+    def load_user(self, user_id: str) -> dict[str, Card]:
+        return {
+            card_id: decode_card(encoded, self.table)
+            for card_id, encoded in self.read_block(*self.blocks[user_id])
+        }
+
+    def iter_users(self) -> Iterator[tuple[str, dict[str, Card]]]:
+        for user_id in self.blocks:
+            yield user_id, self.load_user(user_id)
+
+    def load(self) -> Corpus:
+        return dict(self.iter_users())
+
+
+def is_archive_path(path: str | Path) -> bool:
+    return Path(path).suffix == '.mcba'
+
+
+def load_corpus(path: str | Path) -> Corpus:
+    if is_archive_path(path):
+        with CardArchive(path) as archive:
+            return archive.load()
+
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_corpus(
+    users: Corpus, path: str | Path, compression: Compression = 'zlib'
+) -> None:
+    if is_archive_path(path):
+        save_archive(users, path, compression)
+        return
+
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(users, file, indent=2)
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='zlib')
+    args = parser.parse_args()
+
+    start_time = perf_counter()
+    users = load_corpus(args.input)
+    load_seconds = perf_counter() - start_time
+
+    start_time = perf_counter()
+    save_corpus(users, args.output, args.compression)
+    save_seconds = perf_counter() - start_time
+
+    print(
+        f'{Path(args.input).stat().st_size:,} bytes ({load_seconds:.2f}s load) -> '
+        f'{Path(args.output).stat().st_size:,} bytes ({save_seconds:.2f}s save)'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+import json
+import sys
+from argparse import ArgumentParser
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from copy import deepcopy
+from io import StringIO
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+from typing import NamedTuple
+from xml.etree.ElementTree import Element, parse
+
+from archive import load_corpus
+from deck import DeckGenerator, parse_constraints
+from fetch import get_raw_card_data, parse_card_data
+from mana import parse_mana_cost
+from translate import (
+    BASE_TOKENS,
+    add_card,
+    create_database,
+    get_card_name,
+    get_text,
+    is_original_card,
+    translate_mana_cost,
+    translate_text,
+)
+from type_classes import Card, Corpus
+
+
+class Inputs(NamedTuple):
+    corpus: Corpus
+    cards: list[Card]
+    raw_card_data: list[str]
+    database: Element
+    card_names: list[str]
+
+
+class Result(NamedTuple):
+    name: str
+    cards: int
+    seconds: float
+    peak_memory: int
+
+    @property
+    def cards_per_second(self) -> float:
+        return self.cards / self.seconds if self.seconds else 0
+
+
+def scale_corpus(corpus: Corpus, scale: int) -> Corpus:
+    if scale == 1:
+        return corpus
+
+    scaled: Corpus = {}
+    for copy in range(scale):
+        for user_id, user_cards in corpus.items():
+            copied_cards: dict[str, Card] = {}
+            for card_id, card in user_cards.items():
+                card = deepcopy(card)
+                card['info']['id'] = f'{card_id}-{copy}'
+                card['info']['user_id'] = f'{user_id}-{copy}'
+                copied_cards[card['info']['id']] = card
+            scaled[f'{user_id}-{copy}'] = copied_cards
+    return scaled
+
+
+def scale_database(cards: Element, scale: int) -> Element:
+    scaled = Element('cards')
+    for copy in range(scale):
+        for card in cards.findall('card'):
+            card = deepcopy(card)
+            if copy and (name := card.find('name')) is not None:
+                name.text = f'{name.text} ({copy + 1})'
+            scaled.append(card)
+    return scaled
+
+
+def load_inputs(
+    corpus_path: str, database_path: str, card_names_path: str | None, scale: int
+) -> Inputs:
+    corpus = scale_corpus(load_corpus(corpus_path), scale)
+
+    with open(database_path, encoding='utf-8') as file:
+        assert (database := parse(file).find('cards')) is not None
+    database = scale_database(database, scale)
+
+    if card_names_path is None:
+        card_names = [
+            name.text or '' for name in database.iter('name') if name.text is not None
+        ]
+    else:
+        with open(card_names_path, encoding='utf-8') as file:
+            card_names = json.load(file)
+        if isinstance(card_names, dict):
+            card_names = card_names['data']
+
+    cards = [card for user_cards in corpus.values() for card in user_cards.values()]
+
+    return Inputs(
+        corpus=corpus,
+        cards=cards,
+        raw_card_data=[json.dumps(get_raw_card_data(card['data'])) for card in cards],
+        database=database,
+        card_names=card_names,
+    )
+
+
+def bench_translate_text(inputs: Inputs) -> int:
+    for card in inputs.cards:
+        for text in card['data']['text'].values():
+            translate_text(text['text'], card)
+    return len(inputs.cards)
+
+
+def bench_get_text(inputs: Inputs) -> int:
+    for card in inputs.cards:
+        get_text(card)
+    return len(inputs.cards)
+
+
+def bench_add_card(inputs: Inputs) -> int:
+    _, _, cards = create_database()
+    amount = 0
+    for user_cards in inputs.corpus.values():
+        for card in user_cards.values():
+            if 'type' not in card['data']['text']:
+                continue
+            add_card(cards, card, 'MCB', user_cards, None, False, BASE_TOKENS)
+            amount += 1
+    return amount
+
+
+def bench_translate_mana_cost(inputs: Inputs) -> int:
+    parse_mana_cost.cache_clear()
+    for card in inputs.cards:
+        if 'mana' in card['data']['text']:
+            translate_mana_cost(card['data']['text']['mana']['text'], card)
+    return len(inputs.cards)
+
+
+def bench_originality(inputs: Inputs) -> int:
+    amount = 0
+    for user_cards in inputs.corpus.values():
+        for i, card in enumerate(user_cards.values()):
+            amount += 1
+            if is_original_card(card, inputs.card_names) or i > 20:
+                break
+    return amount
+
+
+def bench_card_names(inputs: Inputs) -> int:
+    for card in inputs.cards:
+        get_card_name(card)
+    return len(inputs.cards)
+
+
+def bench_parse_card_data(inputs: Inputs) -> int:
+    for raw in inputs.raw_card_data:
+        parse_card_data(json.loads(raw))
+    return len(inputs.raw_card_data)
+
+
+def bench_deck_pool(inputs: Inputs) -> int:
+    DeckGenerator.from_element(inputs.database)
+    return len(inputs.database)
+
+
+def bench_deck_legal_cards(inputs: Inputs) -> int:
+    generator = DeckGenerator.from_element(inputs.database)
+    generator.pools = {}
+    for mask in range(len(generator.buckets)):
+        generator.legal_cards(mask)
+    return len(generator.buckets) * len(generator.cards)
+
+
+def bench_deck_generate(inputs: Inputs) -> int:
+    generator = DeckGenerator.from_element(inputs.database)
+    return sum(
+        deck_string.count('\n1 ') for deck_string in generator.generate(200, seed=0)
+    )
+
+
+def bench_deck_generate_constrained(inputs: Inputs) -> int:
+    generator = DeckGenerator.from_element(inputs.database)
+    generator.constraints = parse_constraints(
+        '1:6,2:10,3:10,4:8,5:5,6:3,7:2', 'creature:25,instant:6,sorcery:4'
+    )
+    return sum(
+        deck_string.count('\n1 ') for deck_string in generator.generate(200, seed=0)
+    )
+
+
+BENCHMARKS: dict[str, Callable[[Inputs], int]] = {
+    'translate_text': bench_translate_text,
+    'get_text': bench_get_text,
+    'add_card': bench_add_card,
+    'translate_mana_cost': bench_translate_mana_cost,
+    'originality': bench_originality,
+    'get_card_name': bench_card_names,
+    'parse_card_data': bench_parse_card_data,
+    'deck_pool': bench_deck_pool,
+    'deck_legal_cards': bench_deck_legal_cards,
+    'deck_generate': bench_deck_generate,
+    'deck_generate_constrained': bench_deck_generate_constrained,
+}
+
+
+def run_benchmark(
+    name: str, benchmark: Callable[[Inputs], int], inputs: Inputs, repeat: int
+) -> Result:
+    seconds = float('inf')
+    amount = 0
+
+    with redirect_stdout(StringIO()):
+        for _ in range(repeat):
+            start_time = perf_counter()
+            amount = benchmark(inputs)
+            seconds = min(seconds, perf_counter() - start_time)
+
+        start()
+        try:
+            benchmark(inputs)
+            peak_memory = get_traced_memory()[1]
+        finally:
+            stop()
+
+    return Result(name, amount, seconds, peak_memory)
+
+
+def find_regressions(
+    results: dict[str, Result], baseline: dict[str, dict[str, float]], threshold: float
+) -> list[str]:
+    regressions: list[str] = []
+
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+
+        expected = baseline[key]
+        if result.cards_per_second < expected['cards_per_second'] * (1 - threshold):
+            regressions.append(
+                f'{key}: {result.cards_per_second:.0f} cards/s, '
+                f'baseline {expected["cards_per_second"]:.0f} cards/s'
+            )
+        if result.peak_memory > expected['peak_memory'] * (1 + threshold):
+            regressions.append(
+                f'{key}: {result.peak_memory / 1024:.0f} KiB peak, '
+                f'baseline {expected["peak_memory"] / 1024:.0f} KiB'
+            )
+
+    return regressions
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--corpus', default='cards.json')
+    parser.add_argument('--database', default='01.customcards.xml')
+    parser.add_argument('--card-names')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS)
+    parser.add_argument('--baseline', default='benchmarks.json')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results: dict[str, Result] = {}
+
+    for scale in args.scale:
+        inputs = load_inputs(args.corpus, args.database, args.card_names, scale)
+
+        for name, benchmark in BENCHMARKS.items():
+            if args.only and name not in args.only:
+                continue
+
+            result = run_benchmark(name, benchmark, inputs, args.repeat)
+            results[f'{name}@x{scale}'] = result
+            print(
+                f'{name + f"@x{scale}":<28}'
+                f'{result.cards_per_second:>12.0f} cards/s'
+                f'{result.peak_memory / 1024:>12.0f} KiB peak'
+            )
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    key: {
+                        'cards_per_second': result.cards_per_second,
+                        'peak_memory': result.peak_memory,
+                    }
+                    for key, result in results.items()
+                },
+                file,
+                indent=2,
+            )
+        return
+
+    try:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        return
+
+    if regressions := find_regressions(results, baseline, args.threshold):
+        print('\nRegressions:')
+        for regression in regressions:
+            print(regression)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
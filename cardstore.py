@@ -0,0 +1,369 @@
+import json
+import sqlite3
+from argparse import ArgumentParser
+from collections.abc import Iterable, Iterator
+from hashlib import sha1
+from time import time
+from typing import Any
+
+from archive import load_corpus, save_corpus
+from type_classes import Card, CardData, Frame, Text
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users (id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    visual_type TEXT NOT NULL,
+    language TEXT NOT NULL,
+    set_code TEXT NOT NULL,
+    version TEXT NOT NULL,
+    info TEXT NOT NULL,
+    data_info TEXT NOT NULL,
+    planeswalker TEXT,
+    saga TEXT,
+    set_symbol TEXT,
+    checksum TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    card_id TEXT NOT NULL REFERENCES cards (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    category TEXT,
+    name TEXT NOT NULL,
+    src TEXT,
+    PRIMARY KEY (card_id, position)
+);
+CREATE TABLE IF NOT EXISTS texts (
+    card_id TEXT NOT NULL REFERENCES cards (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    name TEXT,
+    text TEXT NOT NULL,
+    PRIMARY KEY (card_id, position)
+);
+CREATE INDEX IF NOT EXISTS cards_user_id ON cards (user_id, position);
+CREATE INDEX IF NOT EXISTS cards_name ON cards (name);
+CREATE INDEX IF NOT EXISTS cards_category ON cards (category);
+CREATE INDEX IF NOT EXISTS cards_visual_type ON cards (visual_type);
+CREATE INDEX IF NOT EXISTS cards_language ON cards (language);
+CREATE INDEX IF NOT EXISTS cards_set_code ON cards (set_code);
+CREATE INDEX IF NOT EXISTS cards_updated ON cards (updated);
+CREATE INDEX IF NOT EXISTS texts_field ON texts (field, text);
+'''
+
+CARD_COLUMNS = (
+    'id, user_id, position, name, category, visual_type, language, set_code, '
+    'version, info, data_info, planeswalker, saga, set_symbol, checksum, updated'
+)
+
+CARD_FILTERS = {
+    'user_id': 'cards.user_id = ?',
+    'name': 'cards.name = ?',
+    'category': 'cards.category = ?',
+    'visual_type': 'cards.visual_type = ?',
+    'language': 'cards.language = ?',
+    'set_code': 'cards.set_code = ?',
+    'since': 'cards.updated >= ?',
+}
+
+
+def get_stored_name(card: Card) -> str:
+    if 'title' in card['data']['text'] and card['data']['text']['title']['text']:
+        return card['data']['text']['title']['text']
+    return card['info']['card_edition']
+
+
+def get_checksum(card: Card) -> str:
+    return sha1(
+        json.dumps(card, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+
+
+class CardStore:
+    path: str
+    connection: sqlite3.Connection
+
+    def __init__(self, path: str = 'cards.db') -> None:
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> 'CardStore':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def upsert_user(
+        self, user_id: str, user_cards: dict[str, Card], partial: bool = False
+    ) -> int:
+        return self.upsert_users({user_id: user_cards}, partial)
+
+    def upsert_users(
+        self, users: dict[str, dict[str, Card]], partial: bool = False
+    ) -> int:
+        now = time()
+        changed = 0
+
+        with self.connection:
+            for user_id, user_cards in users.items():
+                user_name = next(
+                    (card['info']['user_name'] for card in user_cards.values()), ''
+                )
+                self.connection.execute(
+                    'INSERT INTO users (id, name, updated) VALUES (?, ?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET name = excluded.name',
+                    (user_id, user_name, now),
+                )
+
+                checksums = dict(
+                    self.connection.execute(
+                        'SELECT id, checksum FROM cards WHERE user_id = ?', (user_id,)
+                    )
+                )
+                rows: list[tuple[Any, ...]] = []
+                for position, (card_id, card) in enumerate(user_cards.items()):
+                    checksum = get_checksum(card)
+                    if checksums.get(card_id) == checksum:
+                        self.connection.execute(
+                            'UPDATE cards SET position = ? WHERE id = ?',
+                            (position, card_id),
+                        )
+                        continue
+                    rows.append(
+                        self.get_card_row(user_id, position, card, checksum, now)
+                    )
+
+                removed_ids = (
+                    []
+                    if partial
+                    else [
+                        (card_id,) for card_id in checksums if card_id not in user_cards
+                    ]
+                )
+                if removed_ids:
+                    self.connection.executemany(
+                        'DELETE FROM cards WHERE id = ?', removed_ids
+                    )
+                    changed += len(removed_ids)
+
+                if rows or removed_ids:
+                    self.connection.execute(
+                        'UPDATE users SET updated = ? WHERE id = ?', (now, user_id)
+                    )
+                if not rows:
+                    continue
+
+                changed_ids = [(row[0],) for row in rows]
+                changed_set = {card_id for card_id, in changed_ids}
+                self.connection.executemany(
+                    'DELETE FROM frames WHERE card_id = ?', changed_ids
+                )
+                self.connection.executemany(
+                    'DELETE FROM texts WHERE card_id = ?', changed_ids
+                )
+                self.connection.executemany(
+                    f'INSERT OR REPLACE INTO cards ({CARD_COLUMNS}) '
+                    f'VALUES ({", ".join("?" * 16)})',
+                    rows,
+                )
+                self.connection.executemany(
+                    'INSERT INTO frames (card_id, position, category, name, src) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (
+                        (
+                            card['info']['id'],
+                            position,
+                            frame['category'],
+                            frame['name'],
+                            frame['src'],
+                        )
+                        for card in user_cards.values()
+                        if card['info']['id'] in changed_set
+                        for position, frame in enumerate(card['data']['frames'])
+                    ),
+                )
+                self.connection.executemany(
+                    'INSERT INTO texts (card_id, position, field, name, text) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (
+                        (
+                            card['info']['id'],
+                            position,
+                            field,
+                            settings['name'],
+                            settings['text'],
+                        )
+                        for card in user_cards.values()
+                        if card['info']['id'] in changed_set
+                        for position, (field, settings) in enumerate(
+                            card['data']['text'].items()
+                        )
+                    ),
+                )
+                changed += len(rows)
+
+        return changed
+
+    @staticmethod
+    def get_card_row(
+        user_id: str, position: int, card: Card, checksum: str, updated: float
+    ) -> tuple[Any, ...]:
+        data = card['data']
+        return (
+            card['info']['id'],
+            user_id,
+            position,
+            get_stored_name(card),
+            card['info']['category'],
+            card['info']['visual_type'],
+            data['info']['language'].lower(),
+            data['info']['set'],
+            data['version'],
+            json.dumps(card['info'], ensure_ascii=False),
+            json.dumps(data['info'], ensure_ascii=False),
+            None if data['planeswalker'] is None else json.dumps(data['planeswalker']),
+            None if data['saga'] is None else json.dumps(data['saga']),
+            data['set_symbol'],
+            checksum,
+            updated,
+        )
+
+    def delete_user(self, user_id: str) -> None:
+        with self.connection:
+            self.connection.execute('DELETE FROM cards WHERE user_id = ?', (user_id,))
+            self.connection.execute('DELETE FROM users WHERE id = ?', (user_id,))
+
+    def user_ids(self, since: float | None = None) -> list[str]:
+        if since is None:
+            cursor = self.connection.execute('SELECT id FROM users ORDER BY rowid')
+        else:
+            cursor = self.connection.execute(
+                'SELECT id FROM users WHERE updated >= ? ORDER BY rowid', (since,)
+            )
+        return [user_id for user_id, in cursor]
+
+    def count_cards(self, **filters: str | float) -> int:
+        where, params = self.get_where(filters)
+        return self.connection.execute(
+            f'SELECT COUNT(*) FROM cards {where}', params
+        ).fetchone()[0]
+
+    def iter_cards(self, **filters: str | float) -> Iterator[Card]:
+        where, params = self.get_where(filters)
+        cursor = self.connection.execute(
+            f'SELECT id, info, data_info, planeswalker, saga, set_symbol, version '
+            f'FROM cards {where} ORDER BY user_id, position',
+            params,
+        )
+        while batch := cursor.fetchmany(500):
+            yield from self.load_cards(batch)
+
+    def iter_users(
+        self, user_ids: Iterable[str] | None = None, since: float | None = None
+    ) -> Iterator[tuple[str, dict[str, Card]]]:
+        if user_ids is None:
+            user_ids = self.user_ids(since)
+
+        for user_id in user_ids:
+            yield user_id, {
+                card['info']['id']: card for card in self.iter_cards(user_id=user_id)
+            }
+
+    def load(self) -> dict[str, dict[str, Card]]:
+        return dict(self.iter_users())
+
+    def load_cards(self, rows: list[tuple[Any, ...]]) -> list[Card]:
+        card_ids = [row[0] for row in rows]
+        placeholders = ', '.join('?' * len(card_ids))
+
+        frames: dict[str, list[Frame]] = {card_id: [] for card_id in card_ids}
+        for card_id, category, name, src in self.connection.execute(
+            f'SELECT card_id, category, name, src FROM frames '
+            f'WHERE card_id IN ({placeholders}) ORDER BY card_id, position',
+            card_ids,
+        ):
+            frames[card_id].append({'category': category, 'name': name, 'src': src})
+
+        texts: dict[str, Text] = {card_id: {} for card_id in card_ids}
+        for card_id, field, name, text in self.connection.execute(
+            f'SELECT card_id, field, name, text FROM texts '
+            f'WHERE card_id IN ({placeholders}) ORDER BY card_id, position',
+            card_ids,
+        ):
+            texts[card_id][field] = {'name': name, 'text': text}
+
+        cards: list[Card] = []
+        for card_id, info, data_info, planeswalker, saga, set_symbol, version in rows:
+            data: CardData = {
+                'frames': frames[card_id],
+                'info': json.loads(data_info),
+                'planeswalker': (
+                    None if planeswalker is None else json.loads(planeswalker)
+                ),
+                'saga': None if saga is None else json.loads(saga),
+                'set_symbol': set_symbol,
+                'text': texts[card_id],
+                'version': version,
+            }
+            cards.append({'info': json.loads(info), 'data': data})
+        return cards
+
+    @staticmethod
+    def get_where(filters: dict[str, str | float]) -> tuple[str, list[str | float]]:
+        clauses: list[str] = []
+        params: list[str | float] = []
+        for key, value in filters.items():
+            clauses.append(CARD_FILTERS[key])
+            params.append(value)
+        return ('WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--store', default='cards.db')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import')
+    import_parser.add_argument('input', nargs='?', default='cards.json')
+    export_parser = subparsers.add_parser('export')
+    export_parser.add_argument('output', nargs='?', default='cards.json')
+    query_parser = subparsers.add_parser('query')
+    for key in CARD_FILTERS:
+        query_parser.add_argument(f'--{key.replace("_", "-")}')
+    args = parser.parse_args()
+
+    with CardStore(args.store) as store:
+        match args.command:
+            case 'import':
+                users = load_corpus(args.input)
+                print(f'{store.upsert_users(users)} cards changed')
+            case 'export':
+                save_corpus(store.load(), args.output)
+            case 'query':
+                filters: dict[str, str | float] = {
+                    key: float(value) if key == 'since' else value
+                    for key in CARD_FILTERS
+                    if (value := getattr(args, key)) is not None
+                }
+                for card in store.iter_cards(**filters):
+                    print(
+                        f'{card["info"]["user_id"]}\t{card["info"]["id"]}\t'
+                        f'{get_stored_name(card)}'
+                    )
+
+
+if __name__ == '__main__':
+    main()
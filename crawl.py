@@ -0,0 +1,327 @@
+import sqlite3
+from argparse import ArgumentParser, Namespace
+from asyncio import Semaphore, TaskGroup, create_task, run, sleep
+from collections.abc import Iterable
+from multiprocessing import Process
+from os import getpid
+from socket import gethostname
+from time import sleep as wait, time
+from typing import Literal, NamedTuple
+
+from tqdm import tqdm
+
+from cardstore import CardStore
+from fetch import API_URL, CardFetcher, Session, create_transport, load_card_names
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status, lease_until);
+'''
+
+OWNER_CHECK = (
+    "WHERE id = ? AND status = 'leased' AND worker = ? AND attempts = ? "
+    'AND lease_until >= ?'
+)
+
+type ItemKind = Literal['page', 'user']
+
+
+class WorkItem(NamedTuple):
+    id: int
+    kind: ItemKind
+    key: str
+    attempt: int
+
+
+class WorkQueue:
+    path: str
+    max_attempts: int
+    connection: sqlite3.Connection
+
+    def __init__(self, path: str = 'crawl.db', max_attempts: int = 3) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> 'WorkQueue':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def put(self, kind: ItemKind, keys: Iterable[str]) -> int:
+        changes = self.connection.total_changes
+        now = time()
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO items (kind, key, updated) VALUES (?, ?, ?)',
+                ((kind, key, now) for key in keys),
+            )
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+        return self.connection.total_changes - changes
+
+    def lease(self, worker: str, count: int, seconds: float) -> list[WorkItem]:
+        now = time()
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.execute(
+                "UPDATE items SET status = 'failed', worker = NULL, "
+                "lease_until = NULL, error = 'lease expired', updated = ? "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            items = [
+                WorkItem(*row)
+                for row in self.connection.execute(
+                    'SELECT id, kind, key, attempts + 1 FROM items '
+                    "WHERE status = 'pending' "
+                    "OR (status = 'leased' AND lease_until < ?) "
+                    "ORDER BY kind = 'user' DESC, id LIMIT ?",
+                    (now, count),
+                )
+            ]
+            self.connection.executemany(
+                "UPDATE items SET status = 'leased', worker = ?, lease_until = ?, "
+                'attempts = attempts + 1, updated = ? WHERE id = ?',
+                ((worker, now + seconds, now, item.id) for item in items),
+            )
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+        return items
+
+    def renew(self, worker: str, items: Iterable[WorkItem], seconds: float) -> int:
+        now = time()
+        return sum(
+            self.connection.execute(
+                f'UPDATE items SET lease_until = ?, updated = ? {OWNER_CHECK}',
+                (now + seconds, now, item.id, worker, item.attempt, now),
+            ).rowcount
+            for item in items
+        )
+
+    def complete(self, worker: str, item: WorkItem) -> bool:
+        now = time()
+        return (
+            self.connection.execute(
+                "UPDATE items SET status = 'done', worker = NULL, lease_until = NULL, "
+                f'error = NULL, updated = ? {OWNER_CHECK}',
+                (now, item.id, worker, item.attempt, now),
+            ).rowcount
+            == 1
+        )
+
+    def fail(self, worker: str, item: WorkItem, error: str) -> bool:
+        now = time()
+        return (
+            self.connection.execute(
+                "UPDATE items SET status = CASE WHEN attempts >= ? THEN 'failed' "
+                "ELSE 'pending' END, worker = NULL, lease_until = NULL, error = ?, "
+                f'updated = ? {OWNER_CHECK}',
+                (self.max_attempts, error, now, item.id, worker, item.attempt, now),
+            ).rowcount
+            == 1
+        )
+
+    def remaining(self) -> int:
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM items WHERE status IN ('pending', 'leased')"
+        ).fetchone()[0]
+
+    def counts(self) -> dict[str, int]:
+        return dict(
+            self.connection.execute(
+                'SELECT status, COUNT(*) FROM items GROUP BY status ORDER BY status'
+            )
+        )
+
+    def retry_failed(self) -> int:
+        return self.connection.execute(
+            "UPDATE items SET status = 'pending', attempts = 0, updated = ? "
+            "WHERE status = 'failed'",
+            (time(),),
+        ).rowcount
+
+
+class CrawlWorker:
+    queue: WorkQueue
+    fetcher: CardFetcher
+    name: str
+    lease_size: int
+    lease_seconds: float
+    poll_seconds: float
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        fetcher: CardFetcher,
+        lease_size: int = 4,
+        lease_seconds: float = 300,
+        poll_seconds: float = 1,
+    ) -> None:
+        self.queue = queue
+        self.fetcher = fetcher
+        self.name = f'{gethostname()}:{getpid()}'
+        self.lease_size = lease_size
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+
+    async def process(self, item: WorkItem) -> None:
+        if item.kind == 'page':
+            infos = (await self.fetcher.gallery.fetch_page(int(item.key)))['data']
+            self.queue.put('user', (info['user_id'] for info in infos))
+            return
+
+        await self.fetcher.add_user_gallery(item.key)
+        self.fetcher.users.pop(item.key, None)
+
+    async def process_item(self, item: WorkItem) -> None:
+        try:
+            await self.process(item)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            tqdm.write(f'[{self.name}] {item.kind} {item.key}: {err!r}')
+            owned = self.queue.fail(self.name, item, f'{type(err).__name__}: {err}')
+        else:
+            owned = self.queue.complete(self.name, item)
+
+        if not owned:
+            tqdm.write(f'[{self.name}] lost the lease on {item.kind} {item.key}')
+
+    async def renew_leases(self, items: list[WorkItem]) -> None:
+        while True:
+            await sleep(self.lease_seconds / 3)
+            self.queue.renew(self.name, items, self.lease_seconds)
+
+    async def run(self) -> None:
+        while True:
+            items = self.queue.lease(self.name, self.lease_size, self.lease_seconds)
+            if not items:
+                if not self.queue.remaining():
+                    return
+                await sleep(self.poll_seconds)
+                continue
+
+            renewal = create_task(self.renew_leases(items))
+            try:
+                async with TaskGroup() as task_group:
+                    for item in items:
+                        task_group.create_task(self.process_item(item))
+            finally:
+                renewal.cancel()
+
+
+async def run_worker(args: Namespace) -> None:
+    card_names = (
+        load_card_names(args.card_names) if args.card_names or args.prune else None
+    )
+    transport = create_transport(args.url)
+    semaphore = Semaphore(args.concurrency) if args.concurrency else None
+
+    try:
+        with (
+            WorkQueue(args.queue, args.max_attempts) as queue,
+            CardStore(args.store) as store,
+        ):
+            async with Session(transport=transport, semaphore=semaphore) as session:
+                fetcher = CardFetcher(
+                    session,
+                    store,
+                    card_names,
+                    args.sample_size,
+                    order='recent',
+                    real=False,
+                    language='en',
+                    nsfw=False,
+                )
+                worker = CrawlWorker(
+                    queue, fetcher, args.lease_size, args.lease_seconds
+                )
+                await worker.run()
+    finally:
+        await transport.close()
+
+
+def start_worker(args: Namespace) -> None:
+    run(run_worker(args))
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--queue', default='crawl.db')
+    parser.add_argument('--max-attempts', type=int, default=3)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    seed_parser = subparsers.add_parser('seed')
+    seed_parser.add_argument('--pages', type=int, default=0)
+    seed_parser.add_argument('--users', nargs='+', default=[])
+    seed_parser.add_argument('--retry-failed', action='store_true')
+    work_parser = subparsers.add_parser('work')
+    work_parser.add_argument('--store', default='cards.db')
+    work_parser.add_argument('--workers', type=int, default=4)
+    work_parser.add_argument('--url', default=API_URL)
+    work_parser.add_argument('--concurrency', type=int)
+    work_parser.add_argument('--prune', action='store_true')
+    work_parser.add_argument('--card-names')
+    work_parser.add_argument('--sample-size', type=int, default=3)
+    work_parser.add_argument('--lease-size', type=int, default=4)
+    work_parser.add_argument('--lease-seconds', type=float, default=300)
+    subparsers.add_parser('status')
+    args = parser.parse_args()
+
+    match args.command:
+        case 'seed':
+            with WorkQueue(args.queue, args.max_attempts) as queue:
+                added = queue.put('page', map(str, range(1, args.pages + 1)))
+                added += queue.put('user', args.users)
+                if args.retry_failed:
+                    added += queue.retry_failed()
+            print(f'{added} items queued')
+        case 'work':
+            CardStore(args.store).close()
+            processes = [
+                Process(target=start_worker, args=(args,)) for _ in range(args.workers)
+            ]
+            for process in processes:
+                process.start()
+
+            with (
+                WorkQueue(args.queue, args.max_attempts) as queue,
+                tqdm(desc='Items') as progress_bar,
+            ):
+                while any(process.is_alive() for process in processes):
+                    counts = queue.counts()
+                    progress_bar.total = sum(counts.values())
+                    progress_bar.n = counts.get('done', 0) + counts.get('failed', 0)
+                    progress_bar.refresh()
+                    wait(1)
+
+            for process in processes:
+                process.join()
+        case 'status':
+            with WorkQueue(args.queue, args.max_attempts) as queue:
+                for status, amount in queue.counts().items():
+                    print(f'{status}: {amount}')
+
+
+if __name__ == '__main__':
+    main()
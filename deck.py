@@ -1,17 +1,58 @@
+from __future__ import annotations
+
+import json
 import re
-from random import choice, choices, sample
+from argparse import ArgumentParser
+from collections import Counter, defaultdict, deque
+from collections.abc import Iterator
+from multiprocessing import Pool
+from pathlib import Path
+from random import Random, randrange
+from typing import Any, Literal, NamedTuple, TextIO
 from xml.etree.ElementTree import Element, parse
 
 from iteround import saferound  # type: ignore
 
-with open('01.customcards.xml', encoding='utf-8') as file:
-    xml = parse(file)
+from mana import COLORS, PIP_COLORS, parse_mana_cost
+
+BASIC_LANDS = {
+    'W': 'Plains',
+    'U': 'Island',
+    'B': 'Swamp',
+    'R': 'Mountain',
+    'G': 'Forest',
+    'C': 'Wastes',
+}
+
+COMMANDER_PATTERN = re.compile(
+    r'(?=(?:.*?( can be your commander))?)'
+    r'(?:(?=.*?partner with ([^\n(]+))|(?=.*?(partner)))?',
+    re.DOTALL | re.IGNORECASE,
+)
+
+SNAPSHOT_VERSION = 2
+MAX_CMC = 7
+
+type CommanderKind = Literal['normal', 'partner_with', 'partner']
+type Cell = tuple[int, str]
+type GroupKey = tuple[int | None, str | None]
 
-assert (cards := xml.find('cards')) is not None
 
-commander_options: list[Element] = []
-couple_options: list[tuple[Element, Element]] = []
-partner_cards: list[Element] = []
+class PoolCard(NamedTuple):
+    name: str
+    type: str
+    rulestext: str
+    manacost: str
+    coloridentity: str
+    color_mask: int
+    cmc: int
+    maintype: str
+    pips: tuple[float, ...]
+
+
+class DeckConstraints(NamedTuple):
+    curve: dict[int, int]
+    types: dict[str, int]
 
 
 def is_actual_card(card_element: Element) -> bool:
@@ -26,171 +67,677 @@ def is_actual_card(card_element: Element) -> bool:
     return True
 
 
-for card in cards.findall('card'):
-    if not is_actual_card(card):
-        continue
+def get_color_mask(colors: str) -> int:
+    mask = 0
+    for color in colors:
+        if color in COLORS:
+            mask |= 1 << COLORS.index(color)
+    return mask
 
-    assert (name := card.find('name')) is not None
 
-    if any(
-        (option_name := couple[1].find('name')) is not None
-        and option_name.text == name.text
-        for couple in couple_options
-    ):
-        continue
+def get_pips(manacost: str, cardtype: str, coloridentity: str) -> tuple[float, ...]:
+    is_land = 'land' in cardtype.lower().split()
+    return tuple(
+        pip - (coloridentity.count(color) if is_land else 0)
+        for color, pip in zip(PIP_COLORS, parse_mana_cost(manacost).pips)
+    )
 
-    assert (text := card.find('text')) is not None
-    rulestext = (text.text or '').lower()
 
-    assert (prop := card.find('prop')) is not None
-    assert (cardtype := prop.find('type')) is not None
+def get_cmc_bucket(cmc: str) -> int:
+    try:
+        return min(int(float(cmc)), MAX_CMC)
+    except ValueError:
+        return 0
 
-    types = (cardtype.text or '').partition('—')
-    supertypes, subtypes = types[0].lower().split(), types[2].lower().split()
-
-    if (
-        'legendary' not in supertypes or not 'creature' in supertypes
-    ) and ' can be your commander' not in rulestext:
-        continue
-
-    match = re.search(r'partner with ([^\n(]+)', rulestext)
-    if match:
-        should_continue: bool = False
-        for partner in cards.findall('card'):
-            assert (partner_name := partner.find('name')) is not None
-            if (partner_name.text or '').lower() == match[1].strip():
-                couple_options.append((card, partner))
-                should_continue: bool = True
-                break
-        if should_continue:
-            continue
 
-    if 'partner' in rulestext:
-        partner_cards.append(card)
-        continue
+def parse_targets(value: str) -> dict[str, int]:
+    targets: Counter[str] = Counter()
+    for item in value.split(','):
+        key, _, count = item.rpartition(':')
+        targets[key.strip().lower()] += int(count)
+    return dict(targets)
+
 
-    commander_options.append(card)
+def parse_constraints(curve: str | None, types: str | None) -> DeckConstraints:
+    curve_targets: Counter[int] = Counter()
+    if curve:
+        for key, count in parse_targets(curve).items():
+            curve_targets[get_cmc_bucket(key.rstrip('+'))] += count
+    constraints = DeckConstraints(
+        dict(curve_targets), parse_targets(types) if types else {}
+    )
 
-commander_type = choices(
-    ('normal', 'partner_with', 'partner'),
-    (len(commander_options), len(couple_options), len(partner_cards)),
-)[0]
+    for targets in constraints:
+        if sum(targets.values()) > 58 or min(targets.values(), default=0) < 0:
+            raise ValueError('targets must be non-negative and add up to at most 58')
+    return constraints
 
-commanders: list[Element]
-if commander_type == 'normal':
-    commanders = [choice(commander_options)]
-elif commander_type == 'partner_with':
-    commanders = list(choice(couple_options))
-elif commander_type == 'partner':
-    commanders = sample(partner_cards, 2)
-else:
-    raise ValueError
 
+def sum_pips(cards: list[PoolCard]) -> list[float]:
+    return [sum(column) for column in zip(*(card.pips for card in cards))] or [0] * len(
+        PIP_COLORS
+    )
 
-color_identity: set[str] = set()
-for commander in commanders:
-    assert (prop := commander.find('prop')) is not None
 
+def get_pool_card(card_element: Element) -> PoolCard:
+    assert (name := card_element.find('name')) is not None
+    assert (text := card_element.find('text')) is not None
+    assert (prop := card_element.find('prop')) is not None
+    assert (cardtype := prop.find('type')) is not None
+
+    manacost = prop.find('manacost')
     coloridentity = prop.find('coloridentity')
-    if coloridentity is None or coloridentity.text is None:
-        continue
-    color_identity |= set(coloridentity.text)
+    cmc = prop.find('cmc')
+    maintype = prop.find('maintype')
+    identity = (coloridentity.text or '') if coloridentity is not None else ''
+    cost = (manacost.text or '') if manacost is not None else ''
+
+    return PoolCard(
+        name=name.text or '',
+        type=cardtype.text or '',
+        rulestext=text.text or '',
+        manacost=cost,
+        coloridentity=identity,
+        color_mask=get_color_mask(identity),
+        cmc=get_cmc_bucket((cmc.text or '') if cmc is not None else ''),
+        maintype=((maintype.text or '') if maintype is not None else '').lower(),
+        pips=get_pips(cost, cardtype.text or '', identity),
+    )
+
+
+def classify_commander(card: PoolCard) -> tuple[CommanderKind, str] | None:
+    match = COMMANDER_PATTERN.match(card.rulestext)
+    assert match is not None
+
+    supertypes = card.type.partition('—')[0].lower().split()
+    if ('legendary' not in supertypes or not 'creature' in supertypes) and match[
+        1
+    ] is None:
+        return None
+
+    if match[2] is not None:
+        return 'partner_with', match[2].strip().lower()
+    if match[3] is not None:
+        return 'partner', ''
+    return 'normal', ''
+
+
+class CommanderIndex:
+    cards_by_name: dict[str, PoolCard]
+    paired_names: set[str]
+    commander_options: list[PoolCard]
+    couple_options: list[tuple[PoolCard, PoolCard]]
+    partner_cards: list[PoolCard]
+
+    def __init__(self, cards: list[PoolCard]) -> None:
+        self.cards_by_name = {}
+        self.paired_names = set()
+        self.commander_options = []
+        self.couple_options = []
+        self.partner_cards = []
+
+        for card in cards:
+            self.cards_by_name.setdefault(card.name.lower(), card)
+
+    def add(self, card: PoolCard) -> None:
+        if card.name in self.paired_names:
+            return
+
+        if (classification := classify_commander(card)) is None:
+            return
+        kind, partner_name = classification
+
+        if kind == 'partner_with':
+            if (partner := self.cards_by_name.get(partner_name)) is not None:
+                self.couple_options.append((card, partner))
+                self.paired_names.add(partner.name)
+                return
+            kind = 'partner'
+
+        if kind == 'partner':
+            self.partner_cards.append(card)
+        else:
+            self.commander_options.append(card)
+
+
+class DeckGenerator:
+    cards: list[PoolCard]
+    commanders: CommanderIndex
+    buckets: list[list[PoolCard]]
+    pools: dict[int, list[PoolCard]]
+    cells: list[defaultdict[Cell, list[PoolCard]]]
+    groups: dict[int, dict[GroupKey, list[PoolCard]]]
+    _constraints: DeckConstraints | None
+
+    def __init__(
+        self,
+        cards: list[PoolCard],
+        commanders: CommanderIndex,
+        constraints: DeckConstraints | None = None,
+    ) -> None:
+        self.cards = cards
+        self.commanders = commanders
+        self.buckets = [[] for _ in range(1 << len(COLORS))]
+        self.pools = {}
+        self.cells = [defaultdict(list) for _ in range(1 << len(COLORS))]
+        self.constraints = constraints
+
+        for card in cards:
+            self.buckets[card.color_mask].append(card)
+            self.cells[card.color_mask][card.cmc, card.maintype].append(card)
+
+    @property
+    def constraints(self) -> DeckConstraints | None:
+        return self._constraints
+
+    @constraints.setter
+    def constraints(self, constraints: DeckConstraints | None) -> None:
+        self._constraints = constraints
+        self.groups = {}
+
+    @classmethod
+    def from_element(cls, cards: Element) -> DeckGenerator:
+        all_cards: list[PoolCard] = []
+        pool: list[PoolCard] = []
+
+        for card in cards.findall('card'):
+            pool_card = get_pool_card(card)
+            all_cards.append(pool_card)
+            if is_actual_card(card):
+                pool.append(pool_card)
+
+        commanders = CommanderIndex(all_cards)
+        for card in pool:
+            commanders.add(card)
+
+        return cls(pool, commanders)
+
+    @classmethod
+    def from_file(
+        cls, path: str | Path = '01.customcards.xml', use_snapshot: bool = True
+    ) -> DeckGenerator:
+        snapshot_path = get_snapshot_path(path)
+        if use_snapshot and (generator := cls.load_snapshot(snapshot_path, path)):
+            return generator
+
+        generator = cls.from_element(load_cards_element(path))
+
+        if use_snapshot:
+            generator.save_snapshot(snapshot_path, path)
+        return generator
+
+    @classmethod
+    def load_snapshot(
+        cls, snapshot_path: str | Path, source: str | Path
+    ) -> DeckGenerator | None:
+        try:
+            with open(snapshot_path, encoding='utf-8') as file:
+                snapshot: dict[str, Any] = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get(
+            'source'
+        ) != get_source_stamp(source):
+            return None
+
+        cards = [PoolCard(*row[:-1], pips=tuple(row[-1])) for row in snapshot['cards']]
+
+        commanders = CommanderIndex([])
+        commanders.cards_by_name = {
+            name: cards[i] for name, i in snapshot['cards_by_name'].items()
+        }
+        commanders.paired_names = set(snapshot['paired_names'])
+        commanders.commander_options = [cards[i] for i in snapshot['normal']]
+        commanders.couple_options = [
+            (cards[i], cards[j]) for i, j in snapshot['partner_with']
+        ]
+        commanders.partner_cards = [cards[i] for i in snapshot['partner']]
+
+        return cls([cards[i] for i in snapshot['pool']], commanders)
+
+    def save_snapshot(self, snapshot_path: str | Path, source: str | Path) -> None:
+        cards: list[PoolCard] = []
+        indices: dict[int, int] = {}
+
+        def index(card: PoolCard) -> int:
+            if id(card) not in indices:
+                indices[id(card)] = len(cards)
+                cards.append(card)
+            return indices[id(card)]
+
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'source': get_source_stamp(source),
+            'pool': [index(card) for card in self.cards],
+            'cards_by_name': {
+                name: index(card)
+                for name, card in self.commanders.cards_by_name.items()
+            },
+            'paired_names': sorted(self.commanders.paired_names),
+            'normal': [index(card) for card in self.commanders.commander_options],
+            'partner_with': [
+                [index(card), index(partner)]
+                for card, partner in self.commanders.couple_options
+            ],
+            'partner': [index(card) for card in self.commanders.partner_cards],
+        }
+        snapshot['cards'] = cards
+
+        try:
+            with open(snapshot_path, 'w', encoding='utf-8') as file:
+                json.dump(snapshot, file, ensure_ascii=False)
+        except OSError:
+            pass
+
+    def legal_cards(self, color_mask: int) -> list[PoolCard]:
+        if color_mask not in self.pools:
+            self.pools[color_mask] = [
+                card
+                for mask, bucket in enumerate(self.buckets)
+                if mask & ~color_mask == 0
+                for card in bucket
+            ]
+        return self.pools[color_mask]
+
+    def get_pool_position(self, card: PoolCard, color_mask: int) -> int | None:
+        if card.color_mask & ~color_mask:
+            return None
+
+        offset = sum(
+            len(self.buckets[mask])
+            for mask in range(card.color_mask)
+            if mask & ~color_mask == 0
+        )
+        for i, other in enumerate(self.buckets[card.color_mask]):
+            if other is card:
+                return offset + i
+        return None
+
+    def get_group_key(self, card: PoolCard) -> GroupKey:
+        assert self.constraints is not None
+        curve, types = self.constraints
+        return (
+            card.cmc if card.cmc in curve else None,
+            card.maintype if card.maintype in types else None,
+        )
+
+    def legal_groups(self, color_mask: int) -> dict[GroupKey, list[PoolCard]]:
+        if color_mask not in self.groups:
+            groups: defaultdict[GroupKey, list[PoolCard]] = defaultdict(list)
+            for mask, cells in enumerate(self.cells):
+                if mask & ~color_mask:
+                    continue
+                for cards in cells.values():
+                    groups[self.get_group_key(cards[0])].extend(cards)
+            self.groups[color_mask] = dict(groups)
+        return self.groups[color_mask]
+
+    def allocate_groups(
+        self, rng: Random, amount: int, capacity: dict[GroupKey, int]
+    ) -> tuple[Counter[GroupKey], int]:
+        assert self.constraints is not None
+        curve, types = self.constraints
+        rows: dict[int | None, int] = {**curve, None: amount - sum(curve.values())}
+        columns: dict[str | None, int] = {**types, None: amount - sum(types.values())}
+
+        counts: Counter[GroupKey] = Counter()
+        for row in rng.sample(list(rows), len(rows)):
+            while rows[row] > 0:
+                options = [
+                    column
+                    for column, remaining in columns.items()
+                    if remaining > 0
+                    and counts[row, column] < capacity.get((row, column), 0)
+                ]
+                if not options:
+                    break
+
+                weights = [
+                    capacity[row, column] - counts[row, column] for column in options
+                ]
+                for column in rng.choices(options, weights, k=rows[row]):
+                    if (
+                        columns[column] > 0
+                        and counts[row, column] < capacity[row, column]
+                    ):
+                        counts[row, column] += 1
+                        rows[row] -= 1
+                        columns[column] -= 1
+
+        while self.augment_groups(rng, counts, capacity, rows, columns):
+            pass
+
+        return counts, sum(rows.values())
+
+    @staticmethod
+    def augment_groups(
+        rng: Random,
+        counts: Counter[GroupKey],
+        capacity: dict[GroupKey, int],
+        rows: dict[int | None, int],
+        columns: dict[str | None, int],
+    ) -> bool:
+        starts = [row for row, remaining in rows.items() if remaining > 0]
+        rng.shuffle(starts)
+        order = list(columns)
+        rng.shuffle(order)
+
+        row_parents: dict[int | None, str | None] = {}
+        column_parents: dict[str | None, int | None] = {}
+        queue = deque(starts)
+        seen = set(starts)
+
+        while queue:
+            row = queue.popleft()
+            for column in order:
+                if column in column_parents or counts[row, column] >= capacity.get(
+                    (row, column), 0
+                ):
+                    continue
+                column_parents[column] = row
+
+                if columns[column] > 0:
+                    columns[column] -= 1
+                    while True:
+                        row = column_parents[column]
+                        counts[row, column] += 1
+                        if row not in row_parents:
+                            rows[row] -= 1
+                            return True
+                        column = row_parents[row]
+                        counts[row, column] -= 1
+
+                for other in rows:
+                    if other not in seen and counts[other, column] > 0:
+                        seen.add(other)
+                        row_parents[other] = column
+                        queue.append(other)
+
+        return False
 
+    def choose_constrained_cards(
+        self, rng: Random, commanders: list[PoolCard], color_mask: int
+    ) -> list[PoolCard]:
+        amount = 60 - len(commanders)
+        groups = self.legal_groups(color_mask)
+
+        excluded: Counter[GroupKey] = Counter()
+        for commander in commanders:
+            key = self.get_group_key(commander)
+            if any(card is commander for card in groups.get(key, [])):
+                excluded[key] += 1
+
+        capacity = {key: len(cards) - excluded[key] for key, cards in groups.items()}
+        counts, shortfall = self.allocate_groups(rng, amount, capacity)
+
+        chosen_cards: list[PoolCard] = []
+        for key, count in counts.items():
+            if count <= 0:
+                continue
+            sample = rng.sample(groups[key], count + excluded[key])
+            chosen_cards += [
+                card
+                for card in sample
+                if not any(card is commander for commander in commanders)
+            ][:count]
+
+        if shortfall:
+            chosen = {id(card) for card in chosen_cards + commanders}
+            leftovers = [
+                card for card in self.legal_cards(color_mask) if id(card) not in chosen
+            ]
+            chosen_cards += rng.sample(leftovers, min(shortfall, len(leftovers)))
+
+        return chosen_cards
+
+    def choose_commanders(self, rng: Random) -> list[PoolCard]:
+        commander_type = rng.choices(
+            ('normal', 'partner_with', 'partner'),
+            (
+                len(self.commanders.commander_options),
+                len(self.commanders.couple_options),
+                len(self.commanders.partner_cards),
+            ),
+        )[0]
+
+        if commander_type == 'normal':
+            return [rng.choice(self.commanders.commander_options)]
+        if commander_type == 'partner_with':
+            return list(rng.choice(self.commanders.couple_options))
+        if commander_type == 'partner':
+            return rng.sample(self.commanders.partner_cards, 2)
+        raise ValueError
+
+    def choose_cards(
+        self, rng: Random, commanders: list[PoolCard], color_mask: int
+    ) -> list[PoolCard]:
+        if self.constraints is not None:
+            return self.choose_constrained_cards(rng, commanders, color_mask)
+
+        pool = self.legal_cards(color_mask)
+        excluded = sorted(
+            position
+            for commander in commanders
+            if (position := self.get_pool_position(commander, color_mask)) is not None
+        )
+
+        chosen_cards: list[PoolCard] = []
+        for i in rng.sample(range(len(pool) - len(excluded)), 60 - len(commanders)):
+            for position in excluded:
+                i += i >= position
+            chosen_cards.append(pool[i])
+        return chosen_cards
+
+    def draw_deck(self, rng: Random) -> tuple[list[PoolCard], list[PoolCard], int]:
+        commanders = self.choose_commanders(rng)
+
+        color_mask = 0
+        for commander in commanders:
+            color_mask |= commander.color_mask
+
+        return commanders, self.choose_cards(rng, commanders, color_mask), color_mask
+
+    def generate_deck(self, rng: Random) -> str:
+        commanders, chosen_cards, color_mask = self.draw_deck(rng)
+        return format_deck(
+            commanders, chosen_cards, get_mana(sum_pips(chosen_cards), color_mask)
+        )
+
+    def generate_batch(self, seed: int, indices: range) -> list[str]:
+        return [self.generate_deck(Random(get_deck_seed(seed, i))) for i in indices]
+
+    def generate(
+        self, n: int, seed: int | None = None, processes: int = 1
+    ) -> Iterator[str]:
+        if seed is None:
+            seed = randrange(1 << 32)
+
+        chunksize = max(1, min(256, n // (processes * 4)))
+        chunks = (
+            (seed, range(start, min(start + chunksize, n)))
+            for start in range(0, n, chunksize)
+        )
+
+        if processes == 1:
+            for chunk_seed, indices in chunks:
+                yield from self.generate_batch(chunk_seed, indices)
+            return
+
+        with Pool(processes, initializer=init_worker, initargs=(self,)) as pool:
+            for deck_strings in pool.imap(generate_in_worker, chunks):
+                yield from deck_strings
+
+    def write_directory(
+        self,
+        directory: str | Path,
+        n: int,
+        seed: int | None = None,
+        processes: int = 1,
+    ) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        for i, deck_string in enumerate(self.generate(n, seed, processes)):
+            with open(directory / f'deck{i:05}.dec', 'w', encoding='utf-8') as file:
+                file.write(deck_string)
+
+    def write_stream(
+        self, stream: TextIO, n: int, seed: int | None = None, processes: int = 1
+    ) -> None:
+        for deck_string in self.generate(n, seed, processes):
+            stream.write(deck_string + '\n')
+
+    def write_jsonl(
+        self, stream: TextIO, n: int, seed: int | None = None, processes: int = 1
+    ) -> None:
+        if seed is None:
+            seed = randrange(1 << 32)
+
+        for i, deck_string in enumerate(self.generate(n, seed, processes)):
+            stream.write(
+                json.dumps(
+                    {'index': i, 'seed': get_deck_seed(seed, i), 'deck': deck_string},
+                    ensure_ascii=False,
+                )
+                + '\n'
+            )
+
+
+def get_mana(pips: list[float], color_mask: int) -> dict[str, float]:
+    mana: dict[str, float] = {
+        color: max(amount, 0) for color, amount in zip(PIP_COLORS, pips)
+    }
+
+    if sum(mana.values()) == 0:
+        for color in COLORS:
+            if color_mask & 1 << COLORS.index(color):
+                mana[color] = 1
+        if color_mask == 0:
+            mana['C'] = 1
+
+    ratio = 40 / sum(mana.values())
 
-legal_cards: list[Element] = []
-for card in cards.findall('card'):
-    if not is_actual_card(card):
-        continue
+    for color in mana:
+        mana[color] *= ratio
 
-    if card in commanders:
-        continue
+    return saferound(mana, 0)  # type: ignore
 
-    assert (prop := card.find('prop')) is not None
-    if (
-        (coloridentity := prop.find('coloridentity')) is not None
-        and coloridentity.text is not None
-        and any(color not in color_identity for color in coloridentity.text)
-    ):
-        continue
 
-    legal_cards.append(card)
+def format_deck(
+    commanders: list[PoolCard], chosen_cards: list[PoolCard], mana: dict[str, float]
+) -> str:
+    deck_string: str = '// Commander Zone\n'
 
-for commander in commanders:
-    assert (name := commander.find('name')) is not None
-    print(name.text)
-print(color_identity)
-print(len(legal_cards))
+    for commander in commanders:
+        deck_string += f'SB: 1 {commander.name}\n'
 
-chosen_cards = sample(legal_cards, 60 - len(commanders))
+    deck_string += f'\n// {60 - len(commanders)} Custom Cards\n'
 
-mana: dict[str, float] = {'W': 0, 'U': 0, 'B': 0, 'R': 0, 'G': 0, 'C': 0}
-for card in chosen_cards:
-    assert (prop := card.find('prop')) is not None
+    for card in chosen_cards:
+        deck_string += f'1 {card.name}\n'
 
-    manacost = prop.find('manacost')
-    if manacost is None or manacost.text is None:
-        continue
+    deck_string += '\n// 40 Basic Lands\n'
 
-    for color in mana:
-        mana[color] += manacost.text.count(color)
+    for color, amount in mana.items():
+        if amount == 0:
+            continue
+        deck_string += f'{amount:.0f} {BASIC_LANDS[color]}\n'
 
-print(mana)
+    return deck_string
 
-lands: int = 0
-for card in chosen_cards:
-    assert (prop := card.find('prop')) is not None
-    assert (card_type := prop.find('type')) is not None
 
-    if 'land' in (card_type.text or '').lower().split():
-        coloridentity = prop.find('coloridentity')
+def get_snapshot_path(path: str | Path) -> Path:
+    return Path(f'{path}.snapshot.json')
 
-        for color in (coloridentity.text or '') if coloridentity is not None else '':
-            lands += 1
-            mana[color] -= 1
 
-print(lands)
-print(mana)
+def get_shard_paths(directory: str | Path) -> list[Path]:
+    return sorted(Path(directory).glob('*.xml'))
 
-ratio = 40 / sum(mana.values())
 
-print(ratio)
+def get_source_stamp(path: str | Path) -> list[int | str]:
+    if Path(path).is_dir():
+        return [
+            item
+            for shard in get_shard_paths(path)
+            for item in (shard.name, *get_source_stamp(shard))
+        ]
 
-for color in mana:
-    mana[color] *= ratio
+    stat = Path(path).stat()
+    return [stat.st_mtime_ns, stat.st_size]
 
-print(mana)
 
-mana = saferound(mana, 0)  # type: ignore
+def load_cards_element(path: str | Path) -> Element:
+    if Path(path).is_dir():
+        cards = Element('cards')
+        for shard in get_shard_paths(path):
+            cards.extend(load_cards_element(shard))
+        return cards
 
-print(mana)
+    with open(path, encoding='utf-8') as file:
+        xml = parse(file)
 
-deck_string: str = '// Commander Zone\n'
+    assert (cards := xml.find('cards')) is not None
+    return cards
 
-for commander in commanders:
-    assert (name := commander.find('name')) is not None
-    deck_string += f'SB: 1 {name.text}\n'
 
-deck_string += f'\n// {60 - len(commanders)} Custom Cards\n'
+def get_deck_seed(seed: int, index: int) -> str:
+    return f'{seed}:{index}'
 
-for card in chosen_cards:
-    assert (name := card.find('name')) is not None
-    deck_string += f'1 {name.text}\n'
 
-deck_string += '\n// 40 Basic Lands\n'
+worker_generator: DeckGenerator | None = None  # pylint: disable=invalid-name
 
-basic_lands = {
-    'W': 'Plains',
-    'U': 'Island',
-    'B': 'Swamp',
-    'R': 'Mountain',
-    'G': 'Forest',
-    'C': 'Wastes',
-}
 
-for color, amount in mana.items():
-    if amount == 0:
-        continue
-    deck_string += f'{amount:.0f} {basic_lands[color]}\n'
+def init_worker(generator: DeckGenerator) -> None:
+    global worker_generator  # pylint: disable=global-statement
+    worker_generator = generator
+
+
+def generate_in_worker(args: tuple[int, range]) -> list[str]:
+    assert worker_generator is not None
+    return worker_generator.generate_batch(*args)
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--database', default='01.customcards.xml')
+    parser.add_argument('--count', type=int, default=1)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--output')
+    parser.add_argument('--curve')
+    parser.add_argument('--types')
+    args = parser.parse_args()
+
+    if args.output is None:
+        args.output = 'deck.dec' if args.count == 1 else 'decks'
+    elif (
+        args.count > 1
+        and not args.output.endswith('.jsonl')
+        and Path(args.output).is_file()
+    ):
+        parser.error(f'--output {args.output} is a file; use a directory or .jsonl')
+
+    generator = DeckGenerator.from_file(args.database)
+    if args.curve or args.types:
+        try:
+            generator.constraints = parse_constraints(args.curve, args.types)
+        except ValueError as err:
+            parser.error(str(err))
+
+    if args.count == 1 and args.output.endswith('.dec'):
+        deck_string = next(generator.generate(1, args.seed))
+
+        print(deck_string)
+
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(deck_string)
+    elif args.output.endswith('.jsonl'):
+        with open(args.output, 'w', encoding='utf-8') as file:
+            generator.write_jsonl(file, args.count, args.seed, args.processes)
+    else:
+        generator.write_directory(args.output, args.count, args.seed, args.processes)
+
 
-with open('deck.dec', 'w', encoding='utf-8') as file:
-    file.write(deck_string)
+if __name__ == '__main__':
+    main()
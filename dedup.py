@@ -0,0 +1,300 @@
+import json
+import re
+from argparse import ArgumentParser
+from collections import defaultdict
+from collections.abc import Iterable
+from difflib import SequenceMatcher
+from hashlib import blake2b
+from random import Random
+from typing import NamedTuple, TypedDict
+
+from tqdm import tqdm
+
+from archive import load_corpus, save_corpus
+from translate import extract_features, get_card_name, get_text, translate_text
+from type_classes import Card, Corpus
+
+MERSENNE_PRIME = (1 << 61) - 1
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class DuplicateEntry(TypedDict):
+    id: str
+    user_id: str
+    name: str
+    similarity: float
+
+
+class DuplicateCluster(TypedDict):
+    canonical: DuplicateEntry
+    duplicates: list[DuplicateEntry]
+
+
+class CardKey(NamedTuple):
+    card: Card
+    name: str
+    shingles: frozenset[int]
+
+
+def get_key_text(card: Card) -> tuple[str, str]:
+    name = get_card_name(card)
+    type_line = translate_text(card['data']['text']['type']['text'], card)
+    rules_text = get_text(card)
+    if name:
+        rules_text = rules_text.replace(name, '~')
+    return name, f'{type_line}\n{rules_text}'.lower()
+
+
+def get_shingles(text: str, size: int = 3) -> frozenset[int]:
+    words = WORD_PATTERN.findall(text)
+    if len(words) < size:
+        words += [''] * (size - len(words))
+    return frozenset(
+        int.from_bytes(
+            blake2b(
+                ' '.join(words[i : i + size]).encode('utf-8'), digest_size=8
+            ).digest(),
+        )
+        for i in range(len(words) - size + 1)
+    )
+
+
+def get_jaccard(a: frozenset[int], b: frozenset[int]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1
+
+
+def is_similar_name(first: str, second: str, threshold: float) -> bool:
+    if first.lower() == second.lower():
+        return True
+
+    matcher = SequenceMatcher(None, first.lower(), second.lower())
+    return (
+        matcher.real_quick_ratio() >= threshold
+        and matcher.quick_ratio() >= threshold
+        and matcher.ratio() >= threshold
+    )
+
+
+class MinHashIndex:
+    bands: int
+    rows: int
+    coefficients: list[tuple[int, int]]
+    buckets: defaultdict[tuple[int, tuple[int, ...]], list[int]]
+
+    def __init__(self, bands: int = 16, rows: int = 4, seed: int = 0) -> None:
+        self.bands = bands
+        self.rows = rows
+        rng = Random(seed)
+        self.coefficients = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME))
+            for _ in range(bands * rows)
+        ]
+        self.buckets = defaultdict(list)
+
+    def signature(self, shingles: frozenset[int]) -> list[int]:
+        return [
+            min((a * shingle + b) % MERSENNE_PRIME for shingle in shingles)
+            for a, b in self.coefficients
+        ]
+
+    def add(self, key: int, shingles: frozenset[int]) -> None:
+        signature = self.signature(shingles)
+        for band in range(self.bands):
+            rows = tuple(signature[band * self.rows : (band + 1) * self.rows])
+            self.buckets[band, rows].append(key)
+
+    def candidate_pairs(self, window: int = 32) -> set[tuple[int, int]]:
+        pairs: set[tuple[int, int]] = set()
+        for keys in self.buckets.values():
+            for i, first in enumerate(keys):
+                for second in keys[i + 1 : i + 1 + window]:
+                    pairs.add((first, second))
+        return pairs
+
+
+class UnionFind:
+    parents: list[int]
+
+    def __init__(self, size: int) -> None:
+        self.parents = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parents[item] != item:
+            self.parents[item] = self.parents[self.parents[item]]
+            item = self.parents[item]
+        return item
+
+    def union(self, first: int, second: int) -> None:
+        self.parents[self.find(first)] = self.find(second)
+
+
+def get_linked_ids(corpus: Corpus) -> set[str]:
+    linked: set[str] = set()
+
+    for user_cards in corpus.values():
+        texts: dict[str, str] = {}
+        token_names: dict[str, str] = {}
+        for card_id, card in user_cards.items():
+            if 'type' not in card['data']['text']:
+                continue
+            features = extract_features(card)
+            texts[card_id] = features.text
+            if features.layout == 'transform':
+                linked.add(card_id)
+            if features.is_token and features.name:
+                token_names[card_id] = features.name
+
+        for token_id, token_name in token_names.items():
+            creators = [
+                card_id
+                for card_id, text in texts.items()
+                if card_id != token_id and token_name in text
+            ]
+            if creators:
+                linked.add(token_id)
+                linked.update(creators)
+
+    return linked
+
+
+def get_canonical_rank(card: Card, linked: set[str]) -> tuple[bool, int, int]:
+    return (
+        card['info']['id'] not in linked,
+        -int(card['info']['likes'] or 0),
+        int(card['info']['id']),
+    )
+
+
+def get_entry(key: CardKey, similarity: float) -> DuplicateEntry:
+    return {
+        'id': key.card['info']['id'],
+        'user_id': key.card['info']['user_id'],
+        'name': key.name,
+        'similarity': round(similarity, 3),
+    }
+
+
+def is_duplicate_pair(
+    first: CardKey, second: CardKey, threshold: float, name_threshold: float
+) -> bool:
+    return get_jaccard(
+        first.shingles, second.shingles
+    ) >= threshold and is_similar_name(first.name, second.name, name_threshold)
+
+
+def find_duplicates(
+    cards: Iterable[Card],
+    threshold: float = 0.8,
+    bands: int = 16,
+    rows: int = 4,
+    name_threshold: float = 0.8,
+    linked: set[str] | None = None,
+    window: int = 32,
+) -> list[DuplicateCluster]:
+    if linked is None:
+        linked = set()
+
+    keys: list[CardKey] = []
+    for card in cards:
+        if 'type' not in card['data']['text']:
+            continue
+        name, text = get_key_text(card)
+        keys.append(CardKey(card, name, get_shingles(text)))
+    keys.sort(key=lambda key: key.name.lower())
+
+    index = MinHashIndex(bands, rows)
+    for i, key in enumerate(tqdm(keys, 'Signatures', leave=None)):
+        index.add(i, key.shingles)
+
+    union_find = UnionFind(len(keys))
+    for first, second in index.candidate_pairs(window):
+        if is_duplicate_pair(keys[first], keys[second], threshold, name_threshold):
+            union_find.union(first, second)
+
+    members: defaultdict[int, list[int]] = defaultdict(list)
+    for key in range(len(keys)):
+        members[union_find.find(key)].append(key)
+
+    clusters: list[DuplicateCluster] = []
+    for cluster in members.values():
+        if len(cluster) < 2:
+            continue
+
+        canonical, *duplicates = sorted(
+            cluster, key=lambda key: get_canonical_rank(keys[key].card, linked)
+        )
+        duplicates = [
+            key for key in duplicates if keys[key].card['info']['id'] not in linked
+        ]
+        if not duplicates:
+            continue
+
+        clusters.append(
+            {
+                'canonical': get_entry(keys[canonical], 1),
+                'duplicates': [
+                    get_entry(
+                        keys[key],
+                        get_jaccard(keys[canonical].shingles, keys[key].shingles),
+                    )
+                    for key in duplicates
+                ],
+            }
+        )
+
+    clusters.sort(key=lambda cluster: -len(cluster['duplicates']))
+    return clusters
+
+
+def remove_duplicates(corpus: Corpus, clusters: list[DuplicateCluster]) -> Corpus:
+    removed = {
+        duplicate['id'] for cluster in clusters for duplicate in cluster['duplicates']
+    }
+    return {
+        user_id: {
+            card_id: card
+            for card_id, card in user_cards.items()
+            if card_id not in removed
+        }
+        for user_id, user_cards in corpus.items()
+    }
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--corpus', default='cards.json')
+    parser.add_argument('--output', default='cards.dedup.json')
+    parser.add_argument('--report', default='dedup_report.json')
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--name-threshold', type=float, default=0.8)
+    parser.add_argument('--bands', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=4)
+    parser.add_argument('--window', type=int, default=32)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+
+    clusters = find_duplicates(
+        (card for user_cards in corpus.values() for card in user_cards.values()),
+        args.threshold,
+        args.bands,
+        args.rows,
+        args.name_threshold,
+        get_linked_ids(corpus),
+        args.window,
+    )
+    deduplicated = remove_duplicates(corpus, clusters)
+
+    save_corpus(deduplicated, args.output)
+
+    with open(args.report, 'w', encoding='utf-8') as file:
+        json.dump(clusters, file, indent=2)
+
+    print(
+        f'{len(clusters)} clusters, '
+        f'{sum(len(cluster["duplicates"]) for cluster in clusters)} duplicates removed'
+    )
+
+
+if __name__ == '__main__':
+    main()
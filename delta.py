@@ -0,0 +1,210 @@
+import json
+from argparse import ArgumentParser
+from collections import Counter
+from hashlib import sha256
+from pathlib import Path
+from typing import NamedTuple, TypedDict
+
+from deck import get_shard_paths
+from translate import DatabaseWriter, serialize_card
+from xmlbackend import Element, parse, remove_namespaces
+
+MANIFEST_VERSION = 1
+DELTA_NAME = '01.customcards.delta.xml'
+
+
+class Manifest(TypedDict):
+    version: int
+    cards: dict[str, str]
+
+
+class Database(NamedTuple):
+    sets: list[Element]
+    cards: dict[str, Element]
+
+
+class Delta(NamedTuple):
+    added: list[str]
+    changed: list[str]
+    removed: list[str]
+
+
+def get_card_keys(cards: list[Element]) -> list[str]:
+    seen: Counter[str] = Counter()
+    keys: list[str] = []
+
+    for card in cards:
+        key = f'{card.findtext("set", "")}/{card.findtext("name", "")}'
+        seen[key] += 1
+        keys.append(key if seen[key] == 1 else f'{key}#{seen[key]}')
+
+    return keys
+
+
+def load_elements(path: str | Path) -> tuple[list[Element], list[Element]]:
+    paths = get_shard_paths(path) if Path(path).is_dir() else [Path(path)]
+
+    sets: list[Element] = []
+    cards: list[Element] = []
+    for shard in paths:
+        root = parse(shard)
+        remove_namespaces(root)
+        sets += root.iterfind('sets/set')
+        cards += root.iterfind('cards/card')
+
+    return sets, cards
+
+
+def load_database(path: str | Path) -> Database:
+    sets, cards = load_elements(path)
+    return Database(sets, dict(zip(get_card_keys(cards), cards)))
+
+
+def get_card_hash(card: Element) -> str:
+    return sha256(serialize_card(card).encode('utf-8')).hexdigest()
+
+
+def create_manifest(database: Database) -> Manifest:
+    return {
+        'version': MANIFEST_VERSION,
+        'cards': {key: get_card_hash(card) for key, card in database.cards.items()},
+    }
+
+
+def load_manifest(path: str | Path) -> Manifest:
+    if Path(path).suffix != '.json':
+        return create_manifest(load_database(path))
+
+    with open(path, encoding='utf-8') as file:
+        manifest: Manifest = json.load(file)
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f'{path} is not a version {MANIFEST_VERSION} manifest')
+    return manifest
+
+
+def save_manifest(manifest: Manifest, path: str | Path) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False)
+
+
+def compare_manifests(old: Manifest, new: Manifest) -> Delta:
+    return Delta(
+        added=[key for key in new['cards'] if key not in old['cards']],
+        changed=[
+            key
+            for key, digest in new['cards'].items()
+            if key in old['cards'] and old['cards'][key] != digest
+        ],
+        removed=[key for key in old['cards'] if key not in new['cards']],
+    )
+
+
+def write_database(path: str | Path, sets: list[Element], cards: list[Element]) -> None:
+    with DatabaseWriter(path) as writer:
+        writer.sets.extend(sets)
+        writer.add_serialized_cards([serialize_card(card) for card in cards])
+        writer.finish()
+
+
+def write_delta(
+    directory: str | Path, database: Database, manifest: Manifest, delta: Delta
+) -> None:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    keys = delta.added + delta.changed
+    cards = [database.cards[key] for key in keys]
+    set_names = {card.findtext('set', '') for card in cards}
+    write_database(
+        directory / DELTA_NAME,
+        [
+            set_element
+            for set_element in database.sets
+            if set_element.findtext('name', '') in set_names
+        ],
+        cards,
+    )
+
+    with open(directory / 'keys.json', 'w', encoding='utf-8') as file:
+        json.dump(keys, file, indent=2, ensure_ascii=False)
+
+    with open(directory / 'removed.json', 'w', encoding='utf-8') as file:
+        json.dump(delta.removed, file, indent=2, ensure_ascii=False)
+
+    save_manifest(manifest, directory / 'manifest.json')
+
+
+def apply_delta(path: str | Path, directory: str | Path, output: str | Path) -> bool:
+    directory = Path(directory)
+    database = load_database(path)
+    patch_sets, patch_cards = load_elements(directory / DELTA_NAME)
+
+    with open(directory / 'keys.json', encoding='utf-8') as file:
+        keys: list[str] = json.load(file)
+    if len(keys) != len(patch_cards):
+        raise ValueError(f'{directory / "keys.json"} does not match {DELTA_NAME}')
+    patch = Database(patch_sets, dict(zip(keys, patch_cards)))
+
+    with open(directory / 'removed.json', encoding='utf-8') as file:
+        removed = set(json.load(file))
+
+    cards = {
+        key: patch.cards.get(key, card)
+        for key, card in database.cards.items()
+        if key not in removed
+    }
+    cards.update(patch.cards)
+
+    set_names = {set_element.findtext('name', '') for set_element in database.sets}
+    sets = database.sets + [
+        set_element
+        for set_element in patch.sets
+        if set_element.findtext('name', '') not in set_names
+    ]
+
+    patched = Database(sets, cards)
+    write_database(output, patched.sets, list(patched.cards.values()))
+    return (
+        create_manifest(patched)['cards']
+        == load_manifest(directory / 'manifest.json')['cards']
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    manifest_parser = subparsers.add_parser('manifest')
+    manifest_parser.add_argument('database', nargs='?', default='01.customcards.xml')
+    manifest_parser.add_argument('--output', default='manifest.json')
+    diff_parser = subparsers.add_parser('diff')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new', nargs='?', default='01.customcards.xml')
+    diff_parser.add_argument('--output', default='delta')
+    apply_parser = subparsers.add_parser('apply')
+    apply_parser.add_argument('database')
+    apply_parser.add_argument('delta', nargs='?', default='delta')
+    apply_parser.add_argument('--output', default='01.customcards.xml')
+    args = parser.parse_args()
+
+    match args.command:
+        case 'manifest':
+            save_manifest(create_manifest(load_database(args.database)), args.output)
+        case 'diff':
+            database = load_database(args.new)
+            manifest = create_manifest(database)
+            delta = compare_manifests(load_manifest(args.old), manifest)
+            write_delta(args.output, database, manifest, delta)
+            print(
+                f'{len(delta.added)} added, {len(delta.changed)} changed, '
+                f'{len(delta.removed)} removed, '
+                f'{len(manifest["cards"]) - len(delta.added) - len(delta.changed)} '
+                'unchanged'
+            )
+        case 'apply':
+            if not apply_delta(args.database, args.delta, args.output):
+                raise SystemExit(f'{args.output} does not match the delta manifest')
+
+
+if __name__ == '__main__':
+    main()
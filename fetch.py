@@ -1,16 +1,37 @@
 from __future__ import annotations
 
 import json
-from asyncio import Task, TaskGroup, run, sleep
+import re
+from argparse import ArgumentParser
+from asyncio import Semaphore, Task, TaskGroup, run, sleep
+from bisect import bisect_left
 from collections.abc import AsyncGenerator, Callable, Coroutine
-from contextlib import asynccontextmanager
-from random import choice, randint
-from typing import Any, Unpack
+from contextlib import asynccontextmanager, suppress
+from random import choice, randint, seed
+from time import perf_counter, time
+from typing import Any, TypedDict, Unpack
 
-from aiohttp import ClientConnectionError, ClientSession
+from aiohttp import ClientConnectionError
 from async_lru import alru_cache
 from tqdm import tqdm
 
+from archive import load_corpus, save_corpus
+from cardstore import CardStore
+from frontier import CrawlFrontier
+from translate import (
+    get_card_name,
+    get_reference_card_names,
+    is_original_card,
+    is_original_info,
+)
+from transport import (
+    API_URL,
+    HttpTransport,
+    RecordingTransport,
+    ReplayTransport,
+    Transport,
+)
+
 from type_classes import (
     Card,
     CardData,
@@ -18,85 +39,253 @@ from type_classes import (
     GalleryPage,
     GetGalleryGlobalOptions,
     GetGalleryOptions,
+    SearchGalleryOptions,
 )
 
+PARTNER_PATTERN = re.compile(r'partner with ([^\n({]+)', re.IGNORECASE)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class MethodMetrics(TypedDict):
+    requests: int
+    failures: int
+    retries: int
+    bytes: int
+    seconds: float
+    max_seconds: float
+    histogram: list[int]
+
+
+class RequestMetrics:
+    methods: dict[str, MethodMetrics]
+    calls: int
+    misses: int
+    in_flight: int
+    max_in_flight: int
+    trace: list[dict[str, Any]] | None
+
+    def __init__(self, trace: bool = False) -> None:
+        self.methods = {}
+        self.calls = 0
+        self.misses = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.trace = [] if trace else None
+
+    def start_request(self) -> None:
+        self.misses += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finish_request(
+        self,
+        method: str,
+        params: tuple[tuple[str, Any], ...],
+        started: float,
+        seconds: float,
+        attempts: int,
+        size: int,
+        error: str | None,
+    ) -> None:
+        self.in_flight -= 1
+
+        metrics = self.methods.setdefault(
+            method,
+            {
+                'requests': 0,
+                'failures': 0,
+                'retries': 0,
+                'bytes': 0,
+                'seconds': 0,
+                'max_seconds': 0,
+                'histogram': [0] * (len(LATENCY_BUCKETS) + 1),
+            },
+        )
+        metrics['requests'] += 1
+        metrics['failures'] += error is not None
+        metrics['retries'] += attempts - 1
+        metrics['bytes'] += size
+        metrics['seconds'] += seconds
+        metrics['max_seconds'] = max(metrics['max_seconds'], seconds)
+        metrics['histogram'][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+        if self.trace is not None:
+            self.trace.append(
+                {
+                    'method': method,
+                    'params': dict(params),
+                    'start': started,
+                    'seconds': seconds,
+                    'attempts': attempts,
+                    'bytes': size,
+                    'in_flight': self.in_flight + 1,
+                    'error': error,
+                }
+            )
+
+    def report(self) -> dict[str, Any]:
+        return {
+            'methods': self.methods,
+            'latency_buckets': LATENCY_BUCKETS,
+            'cache': {'hits': self.calls - self.misses, 'misses': self.misses},
+            'max_in_flight': self.max_in_flight,
+        }
+
+    def write_report(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def write_trace(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as file:
+            for entry in self.trace or []:
+                file.write(json.dumps(entry) + '\n')
+
 
 class Session:
-    session: ClientSession
+    transport: Transport
+    owns_transport: bool
+    metrics: RequestMetrics
+    semaphore: Semaphore | None
 
-    def __init__(self) -> None:
-        self.session = ClientSession()
+    def __init__(
+        self,
+        metrics: RequestMetrics | None = None,
+        transport: Transport | None = None,
+        semaphore: Semaphore | None = None,
+    ) -> None:
+        self.owns_transport = transport is None
+        self.transport = transport if transport is not None else HttpTransport()
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self.semaphore = semaphore
 
-        self.send_request = alru_cache(self._send_request)
+        self.cached_request = alru_cache(self._send_request)
 
     async def __aenter__(self) -> Session:
         return self
 
     async def __aexit__(self, *_) -> None:
-        await self.session.close()
+        if self.owns_transport:
+            await self.transport.close()
+
+    async def send_request(
+        self, method: str, params: tuple[tuple[str, Any], ...]
+    ) -> Any:
+        self.metrics.calls += 1
+        return await self.cached_request(method, params)
 
     async def _send_request(
         self, method: str, params: tuple[tuple[str, Any], ...]
     ) -> Any:
-        for i in range(10):
-            try:
-                async with self.session.post(
-                    'https://mtgcardbuilder.com/wp-admin/admin-ajax.php',
-                    data={'action': 'builder_ajax', 'method': method, **dict(params)},
-                    headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                ) as response:
-                    return json.loads(await response.text())
-            except ClientConnectionError as err:
-                tqdm.write(f'[attempt {i}] {type(err).__name__}: {err}')
-                await sleep(1)
-        raise ClientConnectionError
+        self.metrics.start_request()
+        started, start_time = time(), perf_counter()
+        attempts, size, error = 0, 0, None
+
+        try:
+            for i in range(10):
+                attempts = i + 1
+                try:
+                    if self.semaphore is None:
+                        body = await self.transport.post(method, dict(params))
+                    else:
+                        async with self.semaphore:
+                            body = await self.transport.post(method, dict(params))
+                    size = len(body)
+                    result = json.loads(body)
+                    error = None
+                    return result
+                except ClientConnectionError as err:
+                    error = f'{type(err).__name__}: {err}'
+                    tqdm.write(f'[attempt {i}] {error}')
+                    await sleep(1)
+            raise ClientConnectionError
+        except BaseException as err:
+            error = error or f'{type(err).__name__}: {err}'
+            raise
+        finally:
+            self.metrics.finish_request(
+                method,
+                params,
+                started,
+                perf_counter() - start_time,
+                attempts,
+                size,
+                error,
+            )
 
     async def fetch_card_data(self, card_id: str) -> CardData:
-        data = json.loads(
-            (await self.send_request('getCardData', (('id', card_id),)))['data']
+        return parse_card_data(
+            json.loads(
+                (await self.send_request('getCardData', (('id', card_id),)))['data']
+            )
         )
 
-        return {
-            'frames': [
-                {
-                    'category': frame.get('cat'),
-                    'name': frame['name'],
-                    'src': frame['src'] if len(frame['src']) <= 1000 else None,
-                }
-                for frame in data['frames']
-            ],
-            'info': {
-                'artist': data['infoArtist'],
-                'language': data['infoLanguage'],
-                'number': data['infoNumber'],
-                'rarity': data['infoRarity'],
-                'set': data['infoSet'],
-                'year': data['infoYear'],
-            },
-            'planeswalker': (
-                {
-                    'abilities': data['planeswalker']['abilities'],
-                    'count': data['planeswalker']['count'],
-                }
-                if 'planeswalker' in data
-                else None
-            ),
-            'saga': (
-                {'abilities': data['saga']['abilities'], 'count': data['saga']['count']}
-                if 'saga' in data
-                else None
-            ),
-            'set_symbol': (
-                data['setSymbolSource']
-                if data['setSymbolSource'].startswith('https://www.mtgcardbuilder.com/')
-                else None
-            ),
-            'text': {  # type: ignore
-                text: {'name': settings.get('name'), 'text': settings['text']}
-                for text, settings in data['text'].items()
-            },
-            'version': data['version'],
-        }
+
+def parse_card_data(data: dict[str, Any]) -> CardData:
+    return {
+        'frames': [
+            {
+                'category': frame.get('cat'),
+                'name': frame['name'],
+                'src': frame['src'] if len(frame['src']) <= 1000 else None,
+            }
+            for frame in data['frames']
+        ],
+        'info': {
+            'artist': data['infoArtist'],
+            'language': data['infoLanguage'],
+            'number': data['infoNumber'],
+            'rarity': data['infoRarity'],
+            'set': data['infoSet'],
+            'year': data['infoYear'],
+        },
+        'planeswalker': (
+            {
+                'abilities': data['planeswalker']['abilities'],
+                'count': data['planeswalker']['count'],
+            }
+            if 'planeswalker' in data
+            else None
+        ),
+        'saga': (
+            {'abilities': data['saga']['abilities'], 'count': data['saga']['count']}
+            if 'saga' in data
+            else None
+        ),
+        'set_symbol': (
+            data['setSymbolSource']
+            if data['setSymbolSource'].startswith('https://www.mtgcardbuilder.com/')
+            else None
+        ),
+        'text': {  # type: ignore
+            text: {'name': settings.get('name'), 'text': settings['text']}
+            for text, settings in data['text'].items()
+        },
+        'version': data['version'],
+    }
+
+
+def get_raw_card_data(data: CardData) -> dict[str, Any]:
+    return {
+        'frames': [
+            {'cat': frame['category'], 'name': frame['name'], 'src': frame['src'] or ''}
+            for frame in data['frames']
+        ],
+        'infoArtist': data['info']['artist'],
+        'infoLanguage': data['info']['language'],
+        'infoNumber': data['info']['number'],
+        'infoRarity': data['info']['rarity'],
+        'infoSet': data['info']['set'],
+        'infoYear': data['info']['year'],
+        **(
+            {'planeswalker': data['planeswalker']}
+            if data['planeswalker'] is not None
+            else {}
+        ),
+        **({'saga': data['saga']} if data['saga'] is not None else {}),
+        'setSymbolSource': data['set_symbol'] or '',
+        'text': data['text'],
+        'version': data['version'],
+    }
 
 
 class TooManyPages(Exception):
@@ -104,6 +293,7 @@ class TooManyPages(Exception):
 
 
 class CardGallery:
+    method = 'get_gallery_cards'
     session: Session
     options: GetGalleryOptions
 
@@ -114,32 +304,31 @@ class CardGallery:
     async def total_pages(self) -> int:
         return (await self.fetch_page(1))['total']
 
+    def get_params(self, page: int) -> dict[str, Any]:
+        return {
+            'category': (
+                self.options['category'] if 'category' in self.options else 'all'
+            ),
+            'cpage': page,
+            'lang': self.options['language'] if 'language' in self.options else None,
+            'nsfw': (
+                int(self.options['nsfw'])
+                if 'nsfw' in self.options and self.options['nsfw'] is not None
+                else None
+            ),
+            'order': self.options['order'],
+            'other': int(not self.options['real']),
+            'showIsDashboard': (
+                self.options['user_id'] if 'user_id' in self.options else None
+            ),
+        }
+
     async def fetch_page(self, page: int) -> GalleryPage:
         result = await self.session.send_request(
-            'get_gallery_cards',
+            self.method,
             tuple(
                 (key, value)
-                for key, value in {
-                    'category': (
-                        self.options['category']
-                        if 'category' in self.options
-                        else 'all'
-                    ),
-                    'cpage': page,
-                    'lang': (
-                        self.options['language'] if 'language' in self.options else None
-                    ),
-                    'nsfw': (
-                        int(self.options['nsfw'])
-                        if 'nsfw' in self.options and self.options['nsfw'] is not None
-                        else None
-                    ),
-                    'order': self.options['order'],
-                    'other': int(not self.options['real']),
-                    'showIsDashboard': (
-                        self.options['user_id'] if 'user_id' in self.options else None
-                    ),
-                }.items()
+                for key, value in self.get_params(page).items()
                 if value is not None
             ),
         )
@@ -188,57 +377,204 @@ class CardGallery:
         return choice(cards)
 
 
+class CardSearch(CardGallery):
+    method = 'search_gallery_cards'
+    search_options: SearchGalleryOptions
+
+    def __init__(
+        self,
+        session: Session,
+        search_options: SearchGalleryOptions,
+        **kwargs: Unpack[GetGalleryOptions],
+    ) -> None:
+        super().__init__(session, **kwargs)
+        self.search_options = search_options
+
+    def get_params(self, page: int) -> dict[str, Any]:
+        return super().get_params(page) | {
+            'search': (
+                self.search_options['search']
+                if 'search' in self.search_options
+                else None
+            ),
+            'tag': self.search_options['tag'] if 'tag' in self.search_options else None,
+        }
+
+
+class LowQualityUser(Exception):
+    pass
+
+
 class CardFetcher:
     session: Session
     options: GetGalleryGlobalOptions
     users: dict[str, dict[str, Card]]
     gallery: CardGallery
+    store: CardStore | None
+    card_names: list[str] | None
+    sample_size: int
+    attempts: int
+    pruned: set[str]
+    frontier: CrawlFrontier | None
 
     def __init__(
-        self, session: Session, **kwargs: Unpack[GetGalleryGlobalOptions]
+        self,
+        session: Session,
+        store: CardStore | None = None,
+        card_names: list[str] | None = None,
+        sample_size: int = 3,
+        attempts: int = 3,
+        frontier: CrawlFrontier | None = None,
+        **kwargs: Unpack[GetGalleryGlobalOptions],
     ) -> None:
         self.session = session
+        self.store = store
+        self.card_names = card_names
+        self.sample_size = sample_size
+        self.attempts = attempts
+        self.frontier = frontier
         self.options = kwargs
         self.users = {}
+        self.pruned = set()
         self.gallery = CardGallery(self.session, **self.options)
 
+    def has_language(self, card: Card) -> bool:
+        return (
+            'language' not in self.options
+            or self.options['language'] is None
+            or card['data']['info']['language'].lower()
+            in ['', self.options['language']]
+        )
+
+    async def is_quality_gallery(self, gallery: CardGallery) -> bool:
+        assert self.card_names is not None
+
+        candidates = [
+            info
+            for info in (await gallery.fetch_page(1))['data']
+            if is_original_info(info)
+        ][: self.sample_size]
+
+        async with TaskGroup() as task_group:
+            tasks = [
+                task_group.create_task(gallery.session.fetch_card_data(info['id']))
+                for info in candidates
+            ]
+
+        return any(
+            self.has_language(card) and is_original_card(card, self.card_names)
+            for card in (
+                Card(info=info, data=task.result())
+                for info, task in zip(candidates, tasks)
+            )
+        )
+
     @asynccontextmanager
     async def get_user_gallery(self, user_id: str) -> AsyncGenerator[CardGallery, None]:
-        session = Session()
+        session = Session(
+            self.session.metrics, self.session.transport, self.session.semaphore
+        )
         gallery = CardGallery(session, **self.options, user_id=user_id)
         async with session:
             yield gallery
 
     def add_user(self, user_id: str) -> None:
-        if user_id not in self.users:
+        if user_id not in self.users and user_id not in self.pruned:
             self.users[user_id] = {}
 
+    async def discover_users(self) -> int:
+        assert self.frontier is not None
+        total_pages = await self.gallery.total_pages()
+        page = self.frontier.next_page(total_pages)
+        return self.frontier.observe((await self.gallery.fetch_page(page))['data'])
+
+    async def pop_frontier_user(self) -> str:
+        assert self.frontier is not None
+        for _ in range(await self.gallery.total_pages()):
+            if (user_id := self.frontier.pop()) is not None:
+                await self.frontier.wait()
+                return user_id
+            await self.discover_users()
+        raise TooManyPages
+
     async def add_random_user(self) -> str:
+        if self.frontier is not None:
+            user_id = await self.pop_frontier_user()
+            self.add_user(user_id)
+            return user_id
+
         info = await self.gallery.fetch_random_card_info()
         self.add_user(info['user_id'])
         return info['user_id']
 
-    async def add_random_user_gallery(self) -> None:
-        for _ in range(3):
+    async def add_user_gallery(self, user_id: str) -> bool:
+        if user_id in self.pruned:
+            return False
+        self.add_user(user_id)
+
+        try:
+            async with self.get_user_gallery(user_id) as user_gallery:
+                if self.card_names is not None and not (
+                    await self.is_quality_gallery(user_gallery)
+                ):
+                    raise LowQualityUser(user_id)
+
+                self.users[user_id] |= {
+                    card_id: card
+                    for card_id, card in (await user_gallery.fetch_all_cards()).items()
+                    if self.has_language(card)
+                }
+        except TooManyPages:
+            return False
+        except LowQualityUser:
+            tqdm.write(f'pruning user {user_id}')
+            self.pruned.add(user_id)
+            if not self.users.get(user_id):
+                self.users.pop(user_id, None)
+            return False
+
+        if self.store is not None:
+            self.store.upsert_user(user_id, self.users[user_id])
+        if self.frontier is not None:
+            self.frontier.mark_crawled([user_id])
+        return True
+
+    async def add_random_user_gallery(self) -> str:
+        for _ in range(self.attempts):
             user_id = await self.add_random_user()
-            try:
-                async with self.get_user_gallery(user_id) as user_gallery:
-                    self.users[user_id] |= {
-                        card_id: card
-                        for card_id, card in (
-                            await user_gallery.fetch_all_cards()
-                        ).items()
-                        if 'language' not in self.options
-                        or self.options['language'] is None
-                        or card['data']['info']['language'].lower()
-                        in ['', self.options['language']]
-                    }
-            except TooManyPages:
-                pass
-            else:
-                return
+            if await self.add_user_gallery(user_id):
+                return user_id
         raise TooManyPages
 
+    async def add_search_results(
+        self, **kwargs: Unpack[SearchGalleryOptions]
+    ) -> dict[str, Card]:
+        search = CardSearch(self.session, kwargs, **self.options)
+        cards = {
+            card_id: card
+            for card_id, card in (await search.fetch_all_cards()).items()
+            if self.has_language(card)
+        }
+
+        users: dict[str, dict[str, Card]] = {}
+        for card_id, card in cards.items():
+            users.setdefault(card['info']['user_id'], {})[card_id] = card
+
+        for user_id, user_cards in users.items():
+            self.users.setdefault(user_id, {}).update(user_cards)
+            if self.store is not None:
+                self.store.upsert_user(user_id, user_cards, partial=True)
+
+        return cards
+
+    async def add_missing_partners(self) -> set[str]:
+        missing = find_missing_partners(self.users)
+        if missing:
+            async with TaskGroup() as task_group:
+                for name in missing:
+                    task_group.create_task(self.add_search_results(search=name))
+        return missing - find_missing_partners(self.users)
+
     async def add_random_card(self):
         card = await self.gallery.fetch_random_card_info()
 
@@ -250,6 +586,38 @@ class CardFetcher:
         }
 
 
+def find_missing_partners(users: dict[str, dict[str, Card]]) -> set[str]:
+    names: set[str] = set()
+    partners: set[str] = set()
+    for user_cards in users.values():
+        for card in user_cards.values():
+            names.add(get_card_name(card).lower())
+            if 'rules' in card['data']['text'] and (
+                match := PARTNER_PATTERN.search(card['data']['text']['rules']['text'])
+            ):
+                partners.add(match[1].strip())
+    return {name for name in partners if name.lower() not in names}
+
+
+def load_card_names(path: str | None = None) -> list[str]:
+    if path is None:
+        return get_reference_card_names()
+
+    with open(path, encoding='utf-8') as file:
+        card_names = json.load(file)
+    return card_names['data'] if isinstance(card_names, dict) else card_names
+
+
+def create_transport(
+    url: str = API_URL, record: str | None = None, replay: str | None = None
+) -> Transport:
+    if replay:
+        return ReplayTransport(replay)
+    if record:
+        return RecordingTransport(HttpTransport(url), record)
+    return HttpTransport(url)
+
+
 async def repeat_async(
     func: Callable[[], Coroutine[Any, Any, Any]],
     amount: int,
@@ -264,14 +632,88 @@ async def repeat_async(
 
 
 async def main() -> None:
-    async with Session() as session:
-        fetcher = CardFetcher(
-            session, order='recent', real=False, language='en', nsfw=False
-        )
-        await repeat_async(fetcher.add_random_user_gallery, 10, 'Users')
+    parser = ArgumentParser()
+    parser.add_argument('--url', default=API_URL)
+    parser.add_argument('--record')
+    parser.add_argument('--replay')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--output', default='cards.json')
+    parser.add_argument('--store')
+    parser.add_argument('--prune', action='store_true')
+    parser.add_argument('--card-names')
+    parser.add_argument('--sample-size', type=int, default=3)
+    parser.add_argument('--concurrency', type=int)
+    parser.add_argument('--input')
+    parser.add_argument('--search', nargs='+', default=[])
+    parser.add_argument('--tag', nargs='+', default=[])
+    parser.add_argument('--fill-partners', action='store_true')
+    parser.add_argument('--frontier')
+    parser.add_argument('--frontier-rate', type=float)
+    parser.add_argument('--metrics', default='fetch_metrics.json')
+    parser.add_argument('--trace')
+    args = parser.parse_args()
+
+    seed(args.seed)
+    store = CardStore(args.store) if args.store else None
+
+    card_names = (
+        load_card_names(args.card_names) if args.card_names or args.prune else None
+    )
+    transport = create_transport(args.url, args.record, args.replay)
+
+    semaphore = Semaphore(args.concurrency) if args.concurrency else None
+    frontier = (
+        CrawlFrontier(args.frontier, args.frontier_rate) if args.frontier else None
+    )
+
+    metrics = RequestMetrics(args.trace is not None)
+    try:
+        async with Session(metrics, transport, semaphore) as session:
+            fetcher = CardFetcher(
+                session,
+                store,
+                card_names,
+                args.sample_size,
+                10 if card_names is not None else 3,
+                frontier,
+                order='recent',
+                real=False,
+                language='en',
+                nsfw=False,
+            )
+            if args.input:
+                fetcher.users = load_corpus(args.input)
+
+            async def add_user_gallery() -> None:
+                with suppress(TooManyPages):
+                    await fetcher.add_random_user_gallery()
+
+            await repeat_async(add_user_gallery, args.users, 'Users')
 
-    with open('cards.json', 'w', encoding='utf-8') as file:
-        json.dump(fetcher.users, file, indent=2)
+            async with TaskGroup() as task_group:
+                for search in args.search:
+                    task_group.create_task(fetcher.add_search_results(search=search))
+                for tag in args.tag:
+                    task_group.create_task(fetcher.add_search_results(tag=tag))
+
+            if args.fill_partners:
+                found = await fetcher.add_missing_partners()
+                print(f'Found {len(found)} missing partners')
+    finally:
+        await transport.close()
+        if store is not None:
+            store.close()
+        metrics.write_report(args.metrics)
+        if args.trace:
+            metrics.write_trace(args.trace)
+        if frontier is not None:
+            frontier.save()
+
+    save_corpus(fetcher.users, args.output)
+
+    if fetcher.pruned:
+        print(f'Pruned {len(fetcher.pruned)} users')
 
 
 if __name__ == '__main__':
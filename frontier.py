@@ -0,0 +1,156 @@
+import json
+import os
+from asyncio import sleep
+from collections.abc import Iterable
+from heapq import heappop, heappush
+from math import log1p
+from pathlib import Path
+from time import monotonic, time
+from typing import TypedDict
+
+from type_classes import CardInfo
+
+FRONTIER_VERSION = 1
+CATEGORY_COUNT = 8
+
+
+class UserSignals(TypedDict):
+    card_ids: list[str]
+    likes: int
+    categories: list[str]
+    custom: int
+
+
+def get_user_score(signals: UserSignals) -> float:
+    cards = len(signals['card_ids'])
+    return (
+        log1p(signals['likes'])
+        + log1p(cards)
+        + 2 * len(signals['categories']) / CATEGORY_COUNT
+        + 2 * signals['custom'] / max(cards, 1)
+    )
+
+
+class CrawlFrontier:
+    path: Path | None
+    recrawl_after: float
+    users: dict[str, UserSignals]
+    crawled: dict[str, float]
+    page: int
+    heap: list[tuple[float, str]]
+    rate: float | None
+    next_time: float
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        rate: float | None = None,
+        recrawl_after: float = 7 * 24 * 60 * 60,
+    ) -> None:
+        self.path = Path(path) if path is not None else None
+        self.rate = rate
+        self.recrawl_after = recrawl_after
+        self.users = {}
+        self.crawled = {}
+        self.page = 1
+        self.heap = []
+        self.next_time = 0
+
+        if self.path is not None:
+            try:
+                with open(self.path, encoding='utf-8') as file:
+                    state = json.load(file)
+            except FileNotFoundError:
+                pass
+            else:
+                if state.get('version') == FRONTIER_VERSION:
+                    self.users = state['users']
+                    self.crawled = state['crawled']
+                    self.page = state['page']
+
+        for user_id, signals in self.users.items():
+            heappush(self.heap, (-get_user_score(signals), user_id))
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix('.tmp')
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'version': FRONTIER_VERSION,
+                    'users': self.users,
+                    'crawled': self.crawled,
+                    'page': self.page,
+                },
+                file,
+            )
+        os.replace(temporary, self.path)
+
+    def is_fresh(self, user_id: str) -> bool:
+        return (
+            user_id in self.crawled
+            and time() - self.crawled[user_id] < self.recrawl_after
+        )
+
+    def mark_crawled(self, user_ids: Iterable[str]) -> None:
+        now = time()
+        for user_id in user_ids:
+            self.crawled[user_id] = now
+            self.users.pop(user_id, None)
+
+    def observe(self, infos: Iterable[CardInfo]) -> int:
+        changed: set[str] = set()
+
+        for info in infos:
+            user_id = info['user_id']
+            if self.is_fresh(user_id):
+                continue
+
+            signals = self.users.setdefault(
+                user_id, {'card_ids': [], 'likes': 0, 'categories': [], 'custom': 0}
+            )
+            if info['id'] in signals['card_ids']:
+                continue
+
+            signals['card_ids'].append(info['id'])
+            signals['likes'] += int(info['likes'] or 0)
+            if info['category'] not in signals['categories']:
+                signals['categories'].append(info['category'])
+            signals['custom'] += info['visual_type'] == 'custom'
+            changed.add(user_id)
+
+        for user_id in changed:
+            heappush(self.heap, (-get_user_score(self.users[user_id]), user_id))
+        return len(changed)
+
+    def next_page(self, total_pages: int) -> int:
+        page = self.page if self.page <= total_pages else 1
+        self.page = page % total_pages + 1
+        return page
+
+    def pop(self) -> str | None:
+        while self.heap:
+            score, user_id = heappop(self.heap)
+            if (
+                user_id in self.users
+                and -score == get_user_score(self.users[user_id])
+                and not self.is_fresh(user_id)
+            ):
+                return user_id
+        return None
+
+    async def wait(self) -> None:
+        if self.rate is None:
+            return
+
+        now = monotonic()
+        delay = self.next_time - now
+        self.next_time = max(now, self.next_time) + 1 / self.rate
+        if delay > 0:
+            await sleep(delay)
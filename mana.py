@@ -0,0 +1,126 @@
+import re
+from functools import cache
+from typing import Literal, NamedTuple
+
+COLORS = 'WUBRG'
+PIP_COLORS = COLORS + 'C'
+
+type SymbolKind = Literal[
+    'generic',
+    'colored',
+    'colorless',
+    'snow',
+    'variable',
+    'hybrid',
+    'phyrexian',
+    'twobrid',
+    'hybrid_phyrexian',
+    'other',
+]
+
+
+class ManaSymbol(NamedTuple):
+    text: str
+    kind: SymbolKind
+    cmc: int
+    pips: tuple[float, ...]
+
+
+class ManaCost(NamedTuple):
+    symbols: tuple[ManaSymbol, ...]
+    text: str
+    cmc: int
+    colors: str
+    pips: tuple[float, ...]
+
+
+def get_pips(weights: dict[str, float]) -> tuple[float, ...]:
+    return tuple(weights.get(color, 0) for color in PIP_COLORS)
+
+
+HYBRID_ORDER = {
+    frozenset(pair): pair
+    for pair in ('WU', 'WB', 'UB', 'UR', 'BR', 'BG', 'RG', 'RW', 'GW', 'GU')
+}
+
+SYMBOL_PATTERN = re.compile(
+    r'(?P<hybrid_phyrexian>([WUBRG])/?([WUBRG])/?P)'
+    r'|(?P<hybrid>([WUBRG])/?([WUBRG]))'
+    r'|(?P<twobrid>2/?([WUBRG])|([WUBRG])/?2)'
+    r'|(?P<phyrexian>P/?([WUBRG])|([WUBRG])/?P)'
+)
+TOKEN_PATTERN = re.compile(r'\{([^{}]*)}?|([^ {}]+)')
+RUN_PATTERN = re.compile(r'\d+|.')
+
+
+def get_single_symbol(symbol: str) -> ManaSymbol:
+    if symbol.isnumeric():
+        return ManaSymbol(symbol, 'generic', int(symbol), get_pips({}))
+    if symbol in COLORS:
+        return ManaSymbol(symbol, 'colored', 1, get_pips({symbol: 1}))
+    if symbol == 'C':
+        return ManaSymbol(symbol, 'colorless', 1, get_pips({'C': 1}))
+    if symbol == 'S':
+        return ManaSymbol(symbol, 'snow', 1, get_pips({}))
+    if symbol in 'XYZ':
+        return ManaSymbol(symbol, 'variable', 0, get_pips({}))
+    return ManaSymbol(symbol, 'other', 0, get_pips({}))
+
+
+def get_braced_symbol(symbol: str) -> ManaSymbol:
+    if len(symbol) <= 1 or symbol.isnumeric():
+        return get_single_symbol(symbol)
+
+    match = SYMBOL_PATTERN.fullmatch(symbol)
+    if match is None or (match['hybrid'] and match[5] == match[6]):
+        return ManaSymbol('{' + symbol + '}', 'other', 0, get_pips({}))
+
+    colors = ''.join(
+        color for color in match.groups()[1:] if color is not None and len(color) == 1
+    )
+
+    if match['hybrid_phyrexian']:
+        return ManaSymbol(
+            '{' + f'{colors[0]}/{colors[1]}/P' + '}',
+            'hybrid_phyrexian',
+            1,
+            get_pips({colors[0]: 1 / 3, colors[1]: 1 / 3}),
+        )
+    if match['hybrid']:
+        pair = HYBRID_ORDER[frozenset(colors)]
+        return ManaSymbol(
+            '{' + f'{pair[0]}/{pair[1]}' + '}',
+            'hybrid',
+            1,
+            get_pips({pair[0]: 0.5, pair[1]: 0.5}),
+        )
+    if match['twobrid']:
+        return ManaSymbol(
+            '{' + f'2/{colors}' + '}', 'twobrid', 2, get_pips({colors: 0.5})
+        )
+    return ManaSymbol(
+        '{' + f'{colors}/P' + '}', 'phyrexian', 1, get_pips({colors: 0.5})
+    )
+
+
+@cache
+def parse_mana_cost(mana_cost: str) -> ManaCost:
+    symbols: list[ManaSymbol] = []
+
+    for match in TOKEN_PATTERN.finditer(mana_cost.upper()):
+        if match[1] is not None:
+            if match[1]:
+                symbols.append(get_braced_symbol(match[1]))
+        else:
+            symbols += [
+                get_single_symbol(symbol) for symbol in RUN_PATTERN.findall(match[2])
+            ]
+
+    pips = tuple(map(sum, zip(get_pips({}), *(symbol.pips for symbol in symbols))))
+    return ManaCost(
+        symbols=tuple(symbols),
+        text=''.join(symbol.text for symbol in symbols),
+        cmc=sum(symbol.cmc for symbol in symbols),
+        colors=''.join(color for color, pip in zip(COLORS, pips) if pip),
+        pips=pips,
+    )
@@ -0,0 +1,232 @@
+import json
+import os
+from argparse import ArgumentParser
+from asyncio import Semaphore, TaskGroup, run, sleep
+from collections.abc import Iterable
+from hashlib import sha256
+from multiprocessing import Pool
+from pathlib import Path
+from posixpath import splitext
+from urllib.parse import urlsplit
+
+from aiohttp import ClientConnectionError, ClientResponseError, ClientSession
+from tqdm import tqdm
+
+from archive import load_corpus
+from type_classes import Card
+
+try:
+    from PIL import Image  # type: ignore
+except ImportError:
+    Image = None
+
+CONTENT_TYPES = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+
+
+def get_extension(url: str, content_type: str | None) -> str:
+    if content_type is not None and content_type in CONTENT_TYPES:
+        return CONTENT_TYPES[content_type]
+    extension = splitext(urlsplit(url).path)[1].lower()
+    return extension if extension in CONTENT_TYPES.values() else '.img'
+
+
+def get_image_urls(users: dict[str, dict[str, Card]]) -> list[str]:
+    return list(
+        dict.fromkeys(
+            card['info']['image_url']
+            for user_cards in users.values()
+            for card in user_cards.values()
+            if card['info']['image_url']
+        )
+    )
+
+
+def make_thumbnail(args: tuple[str, str, int]) -> str:
+    assert Image is not None
+
+    source, target, size = args
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        image.save(target, 'JPEG', quality=85)
+    return target
+
+
+class ImageMirror:
+    directory: Path
+    concurrency: int
+    source_url: str | None
+    index: dict[str, str]
+
+    def __init__(
+        self,
+        directory: str = 'images',
+        concurrency: int = 16,
+        source_url: str | None = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.concurrency = concurrency
+        self.source_url = source_url
+        self.index = {}
+
+        try:
+            with open(self.index_path, encoding='utf-8') as file:
+                self.index = json.load(file)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / 'index.json'
+
+    def save_index(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.index_path.with_suffix('.tmp')
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.index, file, indent=2)
+        os.replace(temporary, self.index_path)
+
+    def has_image(self, url: str) -> bool:
+        return url in self.index and (self.directory / self.index[url]).is_file()
+
+    def store_image(self, url: str, content: bytes, content_type: str | None) -> str:
+        digest = sha256(content).hexdigest()
+        name = f'objects/{digest[:2]}/{digest}{get_extension(url, content_type)}'
+        path = self.directory / name
+
+        if not path.is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_name(path.name + '.tmp')
+            temporary.write_bytes(content)
+            os.replace(temporary, path)
+
+        self.index[url] = name
+        return name
+
+    def get_source_url(self, url: str) -> str:
+        if self.source_url is None:
+            return url
+
+        parts = urlsplit(url)
+        query = f'?{parts.query}' if parts.query else ''
+        return f'{self.source_url.rstrip("/")}{parts.path}{query}'
+
+    async def download_image(
+        self, session: ClientSession, semaphore: Semaphore, url: str
+    ) -> None:
+        for i in range(5):
+            try:
+                async with (
+                    semaphore,
+                    session.get(self.get_source_url(url)) as response,
+                ):
+                    response.raise_for_status()
+                    content = await response.read()
+                    self.store_image(url, content, response.content_type)
+                    return
+            except ClientResponseError as err:
+                tqdm.write(f'{url}: {err.status} {err.message}')
+                return
+            except ClientConnectionError as err:
+                tqdm.write(f'[attempt {i}] {url}: {type(err).__name__}: {err}')
+                await sleep(1)
+        tqdm.write(f'{url}: giving up')
+
+    async def mirror(self, urls: list[str]) -> int:
+        missing = [url for url in dict.fromkeys(urls) if not self.has_image(url)]
+        if not missing:
+            return 0
+
+        semaphore = Semaphore(self.concurrency)
+        try:
+            with tqdm(total=len(missing), desc='Images') as progress_bar:
+                async with ClientSession() as session, TaskGroup() as task_group:
+                    for url in missing:
+                        task_group.create_task(
+                            self.download_image(session, semaphore, url)
+                        ).add_done_callback(lambda _: progress_bar.update())
+        finally:
+            self.save_index()
+
+        return sum(self.has_image(url) for url in missing)
+
+    def get_thumbnail_name(self, name: str, size: int) -> str:
+        return f'thumbnails/{size}/{Path(name).stem}.jpg'
+
+    def make_thumbnails(self, size: int, processes: int | None = None) -> int:
+        if Image is None:
+            raise RuntimeError('Pillow is required for thumbnails')
+
+        jobs = [
+            (str(self.directory / name), str(self.directory / thumbnail), size)
+            for name in dict.fromkeys(self.index.values())
+            if (self.directory / name).is_file()
+            and not (
+                self.directory / (thumbnail := self.get_thumbnail_name(name, size))
+            ).is_file()
+        ]
+        if not jobs:
+            return 0
+
+        with Pool(processes) as pool:
+            for _ in tqdm(
+                pool.imap_unordered(make_thumbnail, jobs), 'Thumbnails', len(jobs)
+            ):
+                pass
+
+        return len(jobs)
+
+    def get_url(self, url: str, base_url: str, thumbnail: int | None = None) -> str:
+        if not self.has_image(url):
+            return url
+
+        name = self.index[url]
+        if (
+            thumbnail is not None
+            and (self.directory / self.get_thumbnail_name(name, thumbnail)).is_file()
+        ):
+            name = self.get_thumbnail_name(name, thumbnail)
+        return f'{base_url.rstrip("/")}/{name}'
+
+    def rewrite_image_urls(
+        self, cards: Iterable[Card], base_url: str, thumbnail: int | None = None
+    ) -> None:
+        for card in cards:
+            card['info']['image_url'] = self.get_url(
+                card['info']['image_url'], base_url, thumbnail
+            )
+
+
+async def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--corpus', default='cards.json')
+    parser.add_argument('--directory', default='images')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--source-url')
+    parser.add_argument('--thumbnails', type=int)
+    parser.add_argument('--processes', type=int)
+    args = parser.parse_args()
+
+    if args.thumbnails and Image is None:
+        parser.error('--thumbnails requires Pillow')
+
+    users = load_corpus(args.corpus)
+
+    mirror = ImageMirror(args.directory, args.concurrency, args.source_url)
+    downloaded = await mirror.mirror(get_image_urls(users))
+    print(f'Downloaded {downloaded} images, {len(mirror.index)} mirrored')
+
+    if args.thumbnails:
+        made = mirror.make_thumbnails(args.thumbnails, args.processes)
+        print(f'Made {made} thumbnails')
+
+
+if __name__ == '__main__':
+    run(main())
@@ -0,0 +1,235 @@
+from argparse import ArgumentParser
+from asyncio import Queue, Semaphore, TaskGroup, get_running_loop, run
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from random import seed
+
+from tqdm import tqdm
+
+from archive import save_corpus
+from cardstore import CardStore
+from fetch import (
+    API_URL,
+    CardFetcher,
+    RequestMetrics,
+    Session,
+    TooManyPages,
+    create_transport,
+    load_card_names,
+)
+from frontier import CrawlFrontier
+from profiler import profiler
+from translate import (
+    DatabaseWriter,
+    add_user_cards,
+    create_database,
+    get_tokens,
+    has_original_cards,
+    serialize_card,
+)
+from type_classes import Card
+from xmlbackend import fromstring, serialize
+
+type UserCards = tuple[str, dict[str, Card]]
+
+worker_card_names: list[str] = []
+worker_tokens: dict[str, str] = {}
+
+
+def init_worker(card_names: list[str], tokens: dict[str, str]) -> None:
+    global worker_card_names, worker_tokens  # pylint: disable=global-statement
+    worker_card_names = card_names
+    worker_tokens = tokens
+
+
+def translate_in_worker(
+    user_cards: dict[str, Card],
+) -> tuple[str, list[str], Counter[str]] | None:
+    if not has_original_cards(user_cards, worker_card_names):
+        return None
+
+    counters = profiler.counters.copy()
+    _, sets, cards = create_database()
+    add_user_cards(sets, cards, user_cards, worker_tokens)
+    return (
+        serialize(sets),
+        [serialize_card(card) for card in cards],
+        profiler.counters - counters,
+    )
+
+
+class Pipeline:
+    fetcher: CardFetcher
+    writer: DatabaseWriter
+    executor: ProcessPoolExecutor
+    queue: Queue[UserCards | None]
+    users: int
+    remaining: int
+    translated: set[str]
+
+    def __init__(
+        self,
+        fetcher: CardFetcher,
+        writer: DatabaseWriter,
+        executor: ProcessPoolExecutor,
+        users: int,
+        queue_size: int,
+    ) -> None:
+        self.fetcher = fetcher
+        self.writer = writer
+        self.executor = executor
+        self.queue = Queue(queue_size)
+        self.users = users
+        self.remaining = users
+        self.translated = set()
+
+    async def crawl(self, progress_bar: tqdm) -> None:
+        while self.remaining > 0:
+            self.remaining -= 1
+            try:
+                user_id = await self.fetcher.add_random_user_gallery()
+            except TooManyPages:
+                progress_bar.update()
+                continue
+
+            with profiler.phase('queue_wait'):
+                await self.queue.put((user_id, self.fetcher.users[user_id]))
+            progress_bar.update()
+
+    async def translate(self, user_id: str, user_cards: dict[str, Card]) -> None:
+        try:
+            result = await get_running_loop().run_in_executor(
+                self.executor, translate_in_worker, user_cards
+            )
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            tqdm.write(f'failed to translate user {user_id}: {err!r}')
+            profiler.count('users_failed')
+            return
+
+        if result is None:
+            tqdm.write(f'skipping user {user_id}')
+            profiler.count('users_skipped')
+            return
+
+        sets, cards, counters = result
+        created = len(self.writer.sets)
+        self.writer.add_sets(fromstring(sets))
+        self.writer.add_serialized_cards(cards)
+        counters.pop('sets_created', None)
+        profiler.counters.update(counters)
+        profiler.count('sets_created', len(self.writer.sets) - created)
+
+    async def dispatch(self, workers: int) -> None:
+        semaphore = Semaphore(workers)
+
+        async def translate_user(user_id: str, user_cards: dict[str, Card]) -> None:
+            try:
+                await self.translate(user_id, user_cards)
+            finally:
+                semaphore.release()
+
+        async with TaskGroup() as task_group:
+            while (item := await self.queue.get()) is not None:
+                user_id, user_cards = item
+                if user_id in self.translated:
+                    continue
+                self.translated.add(user_id)
+
+                await semaphore.acquire()
+                task_group.create_task(translate_user(user_id, user_cards))
+
+    async def run(self, crawlers: int, workers: int) -> None:
+        with tqdm(total=self.users, desc='Users') as progress_bar:
+            async with TaskGroup() as task_group:
+                dispatcher = task_group.create_task(self.dispatch(workers))
+
+                async with TaskGroup() as crawler_group:
+                    for _ in range(crawlers):
+                        crawler_group.create_task(self.crawl(progress_bar))
+
+                await self.queue.put(None)
+                await dispatcher
+
+
+async def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--url', default=API_URL)
+    parser.add_argument('--record')
+    parser.add_argument('--replay')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--crawlers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int)
+    parser.add_argument('--queue-size', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--prune', action='store_true')
+    parser.add_argument('--card-names')
+    parser.add_argument('--store')
+    parser.add_argument('--corpus')
+    parser.add_argument('--output', default='01.customcards.xml')
+    parser.add_argument('--report', default='pipeline_report.json')
+    parser.add_argument('--frontier')
+    parser.add_argument('--frontier-rate', type=float)
+    parser.add_argument('--metrics', default='fetch_metrics.json')
+    parser.add_argument('--trace')
+    args = parser.parse_args()
+
+    seed(args.seed)
+    profiler.reset()
+
+    with profiler.phase('reference_download'):
+        card_names = load_card_names(args.card_names)
+        tokens = get_tokens()
+
+    store = CardStore(args.store) if args.store else None
+    transport = create_transport(args.url, args.record, args.replay)
+    semaphore = Semaphore(args.concurrency) if args.concurrency else None
+    frontier = (
+        CrawlFrontier(args.frontier, args.frontier_rate) if args.frontier else None
+    )
+
+    metrics = RequestMetrics(args.trace is not None)
+    try:
+        with (
+            DatabaseWriter(args.output) as writer,
+            ProcessPoolExecutor(
+                args.processes, initializer=init_worker, initargs=(card_names, tokens)
+            ) as executor,
+        ):
+            async with Session(metrics, transport, semaphore) as session:
+                fetcher = CardFetcher(
+                    session,
+                    store,
+                    card_names if args.prune else None,
+                    attempts=10 if args.prune else 3,
+                    frontier=frontier,
+                    order='recent',
+                    real=False,
+                    language='en',
+                    nsfw=False,
+                )
+                pipeline = Pipeline(
+                    fetcher, writer, executor, args.users, args.queue_size
+                )
+                with profiler.phase('pipeline'):
+                    await pipeline.run(args.crawlers, args.processes)
+
+            writer.finish()
+    finally:
+        await transport.close()
+        if store is not None:
+            store.close()
+        metrics.write_report(args.metrics)
+        if args.trace:
+            metrics.write_trace(args.trace)
+        if frontier is not None:
+            frontier.save()
+
+    if args.corpus:
+        save_corpus(fetcher.users, args.corpus)
+
+    profiler.write_report(args.report)
+
+
+if __name__ == '__main__':
+    run(main())
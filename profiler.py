@@ -0,0 +1,70 @@
+import json
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from cProfile import Profile
+from time import perf_counter, process_time
+from typing import Any, TypedDict
+
+
+class PhaseTimes(TypedDict):
+    calls: int
+    wall: float
+    cpu: float
+
+
+class Profiler:
+    phases: dict[str, PhaseTimes]
+    counters: Counter[str]
+    profile: Profile | None
+    started: tuple[float, float]
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.phases = {}
+        self.counters = Counter()
+        self.profile = None
+        self.started = (perf_counter(), process_time())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        wall, cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            times = self.phases.setdefault(name, {'calls': 0, 'wall': 0, 'cpu': 0})
+            times['calls'] += 1
+            times['wall'] += perf_counter() - wall
+            times['cpu'] += process_time() - cpu
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+
+    def start_profile(self) -> None:
+        self.profile = Profile()
+        self.profile.enable()
+
+    def stop_profile(self, path: str) -> None:
+        if self.profile is None:
+            return
+
+        self.profile.disable()
+        self.profile.dump_stats(path)
+        self.profile = None
+
+    def report(self) -> dict[str, Any]:
+        return {
+            'wall': perf_counter() - self.started[0],
+            'cpu': process_time() - self.started[1],
+            'phases': self.phases,
+            'counters': dict(self.counters),
+        }
+
+    def write_report(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+profiler = Profiler()
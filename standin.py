@@ -0,0 +1,156 @@
+import json
+from argparse import ArgumentParser
+from asyncio import sleep
+from math import ceil
+from random import Random
+
+from aiohttp import web
+
+from archive import load_corpus
+from fetch import get_raw_card_data
+from type_classes import Card, CardInfo
+
+API_PATH = '/wp-admin/admin-ajax.php'
+IMAGE_PATH = '/images/'
+
+
+class StandInServer:
+    cards: dict[str, Card]
+    page_size: int
+    latency: float
+    jitter: float
+    error_rate: float
+    rng: Random
+
+    def __init__(
+        self,
+        corpus: dict[str, dict[str, Card]],
+        page_size: int = 20,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        seed: int | None = None,
+    ) -> None:
+        self.cards = {
+            card_id: card
+            for user_cards in corpus.values()
+            for card_id, card in user_cards.items()
+        }
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = Random(seed)
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(API_PATH, self.handle)
+        app.router.add_get(IMAGE_PATH + '{name:.+}', self.handle_image)
+        return app
+
+    async def handle_image(self, request: web.Request) -> web.Response:
+        if self.latency or self.jitter:
+            await sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+        name = request.match_info['name'].rsplit('/', 1)[-1]
+        return web.Response(
+            body=f'stand-in image {name}'.encode('utf-8'), content_type='image/png'
+        )
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        params = {
+            key: value
+            for key, value in (await request.post()).items()
+            if isinstance(value, str)
+        }
+
+        if self.latency or self.jitter:
+            await sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+        if self.rng.random() < self.error_rate:
+            assert request.transport is not None
+            request.transport.close()
+            return web.Response()
+
+        match params.get('method'):
+            case 'get_gallery_cards' | 'search_gallery_cards':
+                return web.json_response(self.get_gallery_cards(params))
+            case 'getCardData':
+                card = self.cards.get(params.get('id', ''))
+                if card is None:
+                    return web.json_response({'data': 'null'})
+                return web.json_response(
+                    {'data': json.dumps(get_raw_card_data(card['data']))}
+                )
+            case _:
+                raise web.HTTPBadRequest
+
+    def get_gallery_cards(self, params: dict[str, str]) -> dict[str, object]:
+        infos: list[CardInfo] = []
+        for card in self.cards.values():
+            info = card['info']
+            if params.get('category', 'all') not in ('all', info['category']):
+                continue
+            if (
+                'showIsDashboard' in params
+                and info['user_id'] != params['showIsDashboard']
+            ):
+                continue
+            if params.get('nsfw') == '0' and info['nsfw'] == '1':
+                continue
+            if params.get('other') == '1' and info['visual_type'] != 'custom':
+                continue
+            if 'search' in params and params['search'].lower() not in (
+                f'{info["search_card_name"]} {info["card_edition"]}'.lower()
+            ):
+                continue
+            if 'tag' in params and params['tag'].lower() not in [
+                tag.strip().lower() for tag in (info['tags'] or '').split(',')
+            ]:
+                continue
+            if 'lang' in params and card['data']['info']['language'].lower() not in (
+                '',
+                params['lang'],
+            ):
+                continue
+            infos.append(info)
+
+        if params.get('order') == 'top':
+            infos.sort(key=lambda info: int(info['likes'] or 0), reverse=True)
+        else:
+            infos.sort(key=lambda info: int(info['id']), reverse=True)
+
+        page = int(params.get('cpage', '1'))
+        return {
+            'current': page,
+            'data': infos[(page - 1) * self.page_size : page * self.page_size],
+            'is': '0',
+            'liked': [],
+            'total': max(1, ceil(len(infos) / self.page_size)),
+        }
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--corpus', default='cards.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--jitter', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+
+    server = StandInServer(
+        corpus, args.page_size, args.latency, args.jitter, args.error_rate, args.seed
+    )
+    print(f'Serving on http://{args.host}:{args.port}{API_PATH}')
+    print(f'Serving images on http://{args.host}:{args.port}{IMAGE_PATH}')
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,536 @@
+from argparse import ArgumentParser
+from random import Random
+
+from archive import save_corpus
+from type_classes import Card, CardData, CardInfo, Category, Frame, Text
+
+COLOR_NAMES = {'W': 'White', 'U': 'Blue', 'B': 'Black', 'R': 'Red', 'G': 'Green'}
+
+SYLLABLES = (
+    'ka dra vel mor thi an zul ori sha gen bri tor lys ne qua rix ul mae sor ith'
+).split()
+ADJECTIVES = (
+    'Ancient Blazing Cunning Dread Emerald Fallen Gilded Hollow Iron Jade Restless'
+    ' Silent Verdant Wild'
+).split()
+NOUNS = (
+    'Archer Bloom Charm Drake Edict Familiar Golem Herald Idol Knight Oracle Rampart'
+    ' Sentinel Tide Warden'
+).split()
+CREATURE_TYPES = (
+    'Human Elf Goblin Zombie Spirit Dragon Wizard Soldier Beast Angel Vampire Merfolk'
+    ' Dinosaur Construct'
+).split()
+KEYWORDS = (
+    'Flying',
+    'Trample',
+    'Vigilance',
+    'Deathtouch',
+    'Lifelink',
+    'Haste',
+    'Reach',
+    'Menace',
+    'First strike',
+    'Ward {2}',
+)
+TOKEN_MENTIONS = (
+    'create a Treasure token',
+    'create a Clue token',
+    'create a Food token',
+    'create a Blood token',
+    'create a 1/1 white Soldier creature token',
+    'create a 2/2 black Zombie creature token',
+    'create a 1/1 white Spirit creature token with flying',
+    'create two 1/1 red Goblin creature tokens',
+)
+EFFECTS = (
+    'draw a card',
+    'target creature gets +2/+2 until end of turn',
+    'destroy target artifact or enchantment',
+    '{cardname} deals 3 damage to any target',
+    'return target creature card from your graveyard to your hand',
+    'scry 2',
+    'you gain 3 life',
+    'counter target spell unless its controller pays {3}',
+)
+MARKUP = (
+    ('{fontsize-12}', '{/fontsize-12}'),
+    ('{center}', ''),
+    ('{bold}', '{/bold}'),
+    ('{kerning2}', ''),
+)
+HYBRID_SYMBOLS = ('{w/u}', '{bg}', '{ur}', '{2/w}', '{pb}', '{rwp}')
+
+VERSION_WEIGHTS: dict[str, float] = {
+    'normal': 80,
+    'token': 6,
+    'planeswalker': 3,
+    'saga': 1.5,
+    'class': 0.5,
+    'adventure': 1,
+    'transform': 4,
+    'daybound': 1,
+    'partner_with': 0.5,
+    'real': 3,
+}
+CATEGORY_WEIGHTS: dict[Category, float] = {
+    'creature': 45,
+    'land': 13,
+    'artifact': 10,
+    'instant': 8,
+    'sorcery': 7,
+    'enchantment': 7,
+}
+CATEGORY_TYPES: dict[Category, str] = {
+    'creature': 'Creature',
+    'land': 'Land',
+    'artifact': 'Artifact',
+    'instant': 'Instant',
+    'sorcery': 'Sorcery',
+    'enchantment': 'Enchantment',
+    'planeswalker': 'Planeswalker',
+    'token': 'Token Creature',
+}
+
+
+class CorpusGenerator:
+    rng: Random
+    next_user_id: int
+    next_card_id: int
+
+    def __init__(self, seed: int | None = None) -> None:
+        self.rng = Random(seed)
+        self.next_user_id = 1
+        self.next_card_id = 1
+
+    def generate(
+        self, users: int, mean_cards: float = 70, max_cards: int = 400
+    ) -> dict[str, dict[str, Card]]:
+        corpus: dict[str, dict[str, Card]] = {}
+        for _ in range(users):
+            amount = min(max_cards, 1 + int(self.rng.expovariate(1 / mean_cards)))
+            user_id, user_cards = self.generate_user(amount)
+            corpus[user_id] = user_cards
+        return corpus
+
+    def generate_user(self, amount: int) -> tuple[str, dict[str, Card]]:
+        user_id = str(self.next_user_id)
+        self.next_user_id += 1
+
+        user_name = self.proper_noun() + str(self.rng.randint(1, 99))
+        user: CardInfo = {
+            'artist_name': '',
+            'card_edition': '',
+            'card_id': None,
+            'category': 'card',
+            'dislikes': None,
+            'email': f'{user_name.lower()}@example.com',
+            'face': 'single',
+            'id': '',
+            'image_url': '',
+            'likes': None,
+            'nsfw': '0',
+            'pp_id': None,
+            'prints_regular': '0',
+            'search_card_name': 'null',
+            'status': '1',
+            'tags': None,
+            'user_id': user_id,
+            'user_name': user_name,
+            'visual_type': 'custom',
+        }
+        set_name = self.rng.choice(('MTG', self.proper_noun().upper(), 'P'))
+        first_words: set[str] = set()
+
+        cards: list[Card] = []
+        while len(cards) < amount:
+            kind = self.rng.choices(
+                tuple(VERSION_WEIGHTS), tuple(VERSION_WEIGHTS.values())
+            )[0]
+            first_word = self.proper_noun()
+            while first_word in first_words:
+                first_word = self.proper_noun()
+            first_words.add(first_word)
+
+            cards += self.generate_cards(kind, user, set_name, first_word)
+
+        return user_id, {card['info']['id']: card for card in cards}
+
+    def proper_noun(self) -> str:
+        return ''.join(
+            self.rng.choice(SYLLABLES) for _ in range(self.rng.randint(2, 3))
+        ).capitalize()
+
+    def mana_cost(self, colors: str) -> str:
+        cost = ''
+        generic = self.rng.choices(range(7), (8, 20, 25, 20, 14, 8, 5))[0]
+        if generic:
+            cost += (
+                str(generic) if self.rng.random() < 0.5 else '{' + f'{generic}' + '}'
+            )
+        if self.rng.random() < 0.04:
+            cost = '{x}' + cost
+        for color in colors:
+            for _ in range(self.rng.choices((1, 2, 3), (70, 25, 5))[0]):
+                cost += '{' + color.lower() + '}'
+        if self.rng.random() < 0.05:
+            cost += self.rng.choice(HYBRID_SYMBOLS)
+        return cost
+
+    def colors(self) -> str:
+        amount = self.rng.choices((0, 1, 2, 3, 5), (8, 60, 25, 5, 2))[0]
+        return ''.join(
+            color for color in 'WUBRG' if color in self.rng.sample('WUBRG', amount)
+        )
+
+    def rules_text(self, tokens: bool = True, last_line: str = '') -> str:
+        lines: list[str] = []
+        if self.rng.random() < 0.5:
+            lines.append(', '.join(self.rng.sample(KEYWORDS, self.rng.randint(1, 2))))
+        for _ in range(self.rng.randint(1, 3)):
+            effect = self.rng.choice(EFFECTS)
+            if tokens and self.rng.random() < 0.15:
+                effect = self.rng.choice(TOKEN_MENTIONS)
+            trigger = self.rng.choice(
+                (
+                    'When {cardname} enters the battlefield, ',
+                    'Whenever {cardname} attacks, ',
+                    '{t}: ',
+                    '{2}{' + self.rng.choice('wubrg') + '}, {t}: ',
+                    '',
+                )
+            )
+            line = trigger + effect
+            lines.append(line[0].upper() + line[1:] + '.')
+        if last_line:
+            lines.append(last_line)
+        if self.rng.random() < 0.2:
+            lines.append('{i}(Reminder text.){/i}')
+        text = '\n'.join(lines)
+        if self.rng.random() < 0.2:
+            text += '{flavor}' + 'Flavor text.'
+        if self.rng.random() < 0.6:
+            start, end = self.rng.choice(MARKUP)
+            text = start + text + end
+        return text
+
+    def type_line(self, category: Category, legendary: bool = False) -> str:
+        type_line = ('Legendary ' if legendary else '') + CATEGORY_TYPES[category]
+        if category in ('creature', 'token'):
+            subtypes = self.rng.sample(CREATURE_TYPES, self.rng.randint(1, 2))
+            type_line += ' {-} ' + ' '.join(subtypes)
+        return type_line
+
+    def frames(self, colors: str, category: Category) -> list[Frame]:
+        if len(colors) > 1:
+            frame_colors = ['Multicolored']
+        elif colors:
+            frame_colors = [COLOR_NAMES[colors]]
+        else:
+            frame_colors = ['Artifact' if category == 'artifact' else 'Colorless']
+
+        frames: list[Frame] = [
+            {'category': None, 'name': 'Uploaded Image (0)', 'src': None}
+        ]
+        for color in frame_colors:
+            for part in ('Frame', 'Title', 'Power/Toughness'):
+                frames.append(
+                    {
+                        'category': None,
+                        'name': f'{color} {part}',
+                        'src': f'/img/frames/m15/regular/m15{part[0]}{color[0]}.png',
+                    }
+                )
+        if len(colors) == 2 and self.rng.random() < 0.3:
+            for color in colors:
+                frames.append(
+                    {
+                        'category': None,
+                        'name': f'{COLOR_NAMES[color]} Pip',
+                        'src': f'/img/frames/m15/pips/m15Pip{color}.png',
+                    }
+                )
+        return frames
+
+    def card(
+        self,
+        user: CardInfo,
+        set_name: str,
+        category: Category | str,
+        version: str,
+        colors: str,
+        text: Text,
+        visual_type: str = 'custom',
+        planeswalker: tuple[list[str], int] | None = None,
+        saga: tuple[list[str], int] | None = None,
+    ) -> Card:
+        card_id = str(self.next_card_id)
+        self.next_card_id += 1
+
+        info: CardInfo = {
+            **user,  # type: ignore
+            'card_edition': text['title']['text'],
+            'category': category,  # type: ignore
+            'id': card_id,
+            'image_url': f'https://example.com/builder/imgs/{card_id}.png',
+            'likes': str(self.rng.randint(0, 40)) if self.rng.random() < 0.4 else None,
+            'tags': None,
+            'visual_type': visual_type,  # type: ignore
+        }
+        data: CardData = {
+            'frames': self.frames(colors, category),  # type: ignore
+            'info': {
+                'artist': '',
+                'language': 'EN',
+                'number': self.rng.choice(
+                    ('2024', '2023', str(self.rng.randint(1, 300)))
+                ),
+                'rarity': self.rng.choice(('P', '', 'c', 'u', 'r', 'm')),
+                'set': set_name,
+                'year': '2024',
+            },
+            'planeswalker': (
+                {'abilities': planeswalker[0], 'count': planeswalker[1]}
+                if planeswalker is not None
+                else None
+            ),
+            'saga': (
+                {'abilities': saga[0], 'count': saga[1]} if saga is not None else None
+            ),
+            'set_symbol': None,
+            'text': text,
+            'version': version,
+        }
+        return {'info': info, 'data': data}
+
+    def text(self, **texts: str) -> Text:
+        names = {
+            'title': 'Title',
+            'type': 'Type',
+            'mana': 'Mana Cost',
+            'rules': 'Rules Text',
+            'pt': 'Power/Toughness',
+        }
+        return {
+            key: {'name': names.get(key, key.capitalize()), 'text': text}
+            for key, text in texts.items()
+        }
+
+    def power_toughness(self) -> str:
+        return f'{self.rng.randint(0, 6)}/{self.rng.randint(1, 6)}'
+
+    def generate_cards(
+        self, kind: str, user: CardInfo, set_name: str, first_word: str
+    ) -> list[Card]:
+        category = self.rng.choices(
+            tuple(CATEGORY_WEIGHTS), tuple(CATEGORY_WEIGHTS.values())
+        )[0]
+        colors = '' if category in ('land', 'artifact') else self.colors()
+        name = f'{first_word}, {self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)}'
+        legendary = category == 'creature' and self.rng.random() < 0.25
+
+        match kind:
+            case 'token':
+                text = self.text(
+                    title=f'{first_word} {self.rng.choice(CREATURE_TYPES)}',
+                    type=self.type_line('token'),
+                    rules=self.rng.choice(KEYWORDS),
+                    pt=self.power_toughness(),
+                )
+                return [
+                    self.card(user, set_name, 'token', 'tokenRegular', colors, text)
+                ]
+
+            case 'planeswalker':
+                count = self.rng.randint(3, 4)
+                abilities = ['+1', '-2', '-7', ''][:count]
+                text = self.text(
+                    title=name,
+                    type=f'Legendary Planeswalker {{-}} {first_word}',
+                    mana=self.mana_cost(colors or 'W'),
+                    loyalty=str(self.rng.randint(3, 6)),
+                    **{f'ability{i}': self.rules_text() for i in range(count)},
+                )
+                return [
+                    self.card(
+                        user,
+                        set_name,
+                        'planeswalker',
+                        'planeswalkerRegular',
+                        colors,
+                        text,
+                        planeswalker=(abilities, count),
+                    )
+                ]
+
+            case 'saga':
+                count = 3
+                text = self.text(
+                    title=name,
+                    type='Enchantment {-} Saga',
+                    mana=self.mana_cost(colors),
+                    reminder='(As this Saga enters and after your draw step, '
+                    'add a lore counter. Sacrifice after III.)',
+                    **{f'ability{i}': self.rules_text() for i in range(count)},
+                )
+                return [
+                    self.card(
+                        user,
+                        set_name,
+                        'enchantment',
+                        'sagaRegular',
+                        colors,
+                        text,
+                        saga=(['1', '1', '1'], count),
+                    )
+                ]
+
+            case 'class':
+                text = self.text(
+                    title=name,
+                    type='Enchantment {-} Class',
+                    mana=self.mana_cost(colors),
+                    level0c=self.rules_text(),
+                    **{
+                        f'level{level}{part}': (
+                            self.rules_text()
+                            if part != 'a'
+                            else self.mana_cost(colors) + ': Level ' + level
+                        )
+                        for level in '123'
+                        for part in 'abc'
+                    },
+                )
+                return [self.card(user, set_name, 'enchantment', 'class', colors, text)]
+
+            case 'adventure':
+                text = self.text(
+                    title=name,
+                    type=self.type_line('creature'),
+                    mana=self.mana_cost(colors),
+                    rules=self.rules_text(),
+                    pt=self.power_toughness(),
+                    title2=f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)}',
+                    type2='Instant {-} Adventure',
+                    mana2=self.mana_cost(colors),
+                    rules2=self.rules_text(tokens=False),
+                )
+                return [
+                    self.card(user, set_name, 'creature', 'adventure', colors, text)
+                ]
+
+            case 'transform' | 'daybound':
+                back_pt = self.power_toughness()
+                keyword = 'Daybound' if kind == 'daybound' else 'Transform'
+                front_text = self.text(
+                    title=name,
+                    type=self.type_line('creature', legendary),
+                    mana=self.mana_cost(colors),
+                    rules=self.rules_text(
+                        tokens=False, last_line=f'{{2}}: {keyword} {{cardname}}.'
+                    ),
+                    pt=self.power_toughness(),
+                    reminder=back_pt,
+                )
+                back_text = self.text(
+                    title=f'{first_word}, {self.rng.choice(ADJECTIVES)} '
+                    + self.rng.choice(NOUNS),
+                    type=self.type_line('creature', legendary),
+                    rules=self.rules_text(
+                        tokens=False,
+                        last_line='Nightbound' if kind == 'daybound' else '',
+                    ),
+                    pt=back_pt,
+                )
+                return [
+                    self.card(
+                        user,
+                        set_name,
+                        'creature',
+                        'm15TransformFront',
+                        colors,
+                        front_text,
+                    ),
+                    self.card(
+                        user,
+                        set_name,
+                        'creature',
+                        'm15TransformBack',
+                        colors,
+                        back_text,
+                    ),
+                ]
+
+            case 'partner_with':
+                names = [
+                    name,
+                    f'{first_word}, {self.rng.choice(ADJECTIVES)} '
+                    + self.rng.choice(NOUNS),
+                ]
+                return [
+                    self.card(
+                        user,
+                        set_name,
+                        'creature',
+                        'm15Regular',
+                        colors,
+                        self.text(
+                            title=names[i],
+                            type=self.type_line('creature', legendary=True),
+                            mana=self.mana_cost(colors),
+                            rules=self.rules_text(
+                                last_line=f'Partner with {names[1 - i]}'
+                            ),
+                            pt=self.power_toughness(),
+                        ),
+                    )
+                    for i in range(2)
+                ]
+
+            case _:
+                text = self.text(
+                    title=name,
+                    type=self.type_line(category, legendary),
+                    rules=self.rules_text(
+                        last_line=(
+                            'Partner' if legendary and self.rng.random() < 0.1 else ''
+                        )
+                    ),
+                )
+                if category != 'land':
+                    text |= self.text(mana=self.mana_cost(colors))
+                if category == 'creature':
+                    text |= self.text(pt=self.power_toughness())
+                return [
+                    self.card(
+                        user,
+                        set_name,
+                        category,
+                        self.rng.choice(
+                            ('m15Regular', 'promoNickname', 'promoRegular')
+                        ),
+                        colors,
+                        text,
+                        visual_type='real' if kind == 'real' else 'custom',
+                    )
+                ]
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--mean-cards', type=float, default=70)
+    parser.add_argument('--max-cards', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='synthetic_cards.json')
+    args = parser.parse_args()
+
+    corpus = CorpusGenerator(args.seed).generate(
+        args.users, args.mean_cards, args.max_cards
+    )
+
+    save_corpus(corpus, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from archive import CardArchive, Compression, load_corpus, save_corpus
+from synthetic import CorpusGenerator
+
+
+@pytest.mark.parametrize('compression', ['zlib', 'lzma'])
+def test_archive_round_trip(tmp_path: Path, compression: Compression) -> None:
+    corpus = CorpusGenerator(0).generate(5, mean_cards=8)
+    path = tmp_path / 'cards.mcba'
+
+    save_corpus(corpus, path, compression)
+
+    assert json.dumps(load_corpus(path)) == json.dumps(corpus)
+    with CardArchive(path) as archive:
+        assert archive.compression == compression
+        assert archive.user_ids() == list(corpus)
+        assert archive.load_user('3') == corpus['3']
+
+
+def test_archive_rejects_other_files(tmp_path: Path) -> None:
+    path = tmp_path / 'cards.mcba'
+    path.write_bytes(b'{"not": "an archive"}')
+
+    with pytest.raises(ValueError):
+        CardArchive(path)
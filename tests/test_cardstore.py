@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from cardstore import CardStore
+from synthetic import CorpusGenerator
+
+
+def test_upsert_removes_missing_cards(tmp_path: Path) -> None:
+    user_id, user_cards = CorpusGenerator(0).generate_user(30)
+    kept = dict(list(user_cards.items())[1:])
+
+    with CardStore(str(tmp_path / 'cards.db')) as store:
+        store.upsert_user(user_id, user_cards)
+        since = store.connection.execute('SELECT MAX(updated) FROM users').fetchone()[0]
+        assert store.user_ids(since + 1) == []
+
+        assert store.upsert_user(user_id, kept) == 1
+        assert store.count_cards(user_id=user_id) == len(kept)
+        assert store.load() == {user_id: kept}
+        assert store.user_ids(since + 1e-6) == [user_id]
+        for table in ('frames', 'texts'):
+            assert not store.connection.execute(
+                f'SELECT COUNT(*) FROM {table} '
+                'WHERE card_id NOT IN (SELECT id FROM cards)'
+            ).fetchone()[0]
+
+
+def test_partial_upsert_keeps_other_cards(tmp_path: Path) -> None:
+    user_id, user_cards = CorpusGenerator(0).generate_user(30)
+    card_id = next(iter(user_cards))
+
+    with CardStore(str(tmp_path / 'cards.db')) as store:
+        store.upsert_user(user_id, user_cards)
+        assert store.upsert_user(user_id, {card_id: user_cards[card_id]}, True) == 0
+        assert store.count_cards(user_id=user_id) == len(user_cards)
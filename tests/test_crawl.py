@@ -0,0 +1,71 @@
+from pathlib import Path
+
+from crawl import WorkQueue
+
+
+def make_queue(tmp_path: Path, max_attempts: int = 3) -> WorkQueue:
+    queue = WorkQueue(str(tmp_path / 'crawl.db'), max_attempts)
+    queue.put('user', ['1', '2'])
+    return queue
+
+
+def test_only_the_owner_completes(tmp_path: Path) -> None:
+    with make_queue(tmp_path) as queue:
+        first, second = queue.lease('a', 2, 60)
+
+        assert not queue.complete('b', first)
+        assert not queue.fail('b', second, 'error')
+        assert queue.complete('a', first)
+        assert not queue.complete('a', first)
+        assert queue.counts() == {'done': 1, 'leased': 1}
+
+
+def test_expired_lease_is_reissued(tmp_path: Path) -> None:
+    with make_queue(tmp_path) as queue:
+        item, _ = queue.lease('a', 2, -1)
+
+        reissued = queue.lease('b', 1, 60)[0]
+        assert reissued.id == item.id
+        assert not queue.complete('a', item)
+        assert queue.complete('b', reissued)
+
+
+def test_same_worker_needs_the_current_lease(tmp_path: Path) -> None:
+    with make_queue(tmp_path) as queue:
+        item = queue.lease('a', 1, -1)[0]
+        again = queue.lease('a', 1, 60)[0]
+
+        assert again.id == item.id
+        assert not queue.complete('a', item)
+        assert queue.complete('a', again)
+
+
+def test_renewal_keeps_the_lease(tmp_path: Path) -> None:
+    with make_queue(tmp_path, max_attempts=1) as queue:
+        items = queue.lease('a', 2, 0.01)
+
+        assert queue.renew('a', items, 60) == 2
+        assert queue.renew('b', items, 60) == 0
+        assert queue.lease('b', 2, 60) == []
+        assert queue.counts() == {'leased': 2}
+        assert all(queue.complete('a', item) for item in items)
+
+
+def test_failures_retry_until_max_attempts(tmp_path: Path) -> None:
+    with make_queue(tmp_path, max_attempts=2) as queue:
+        for status in ('pending', 'failed'):
+            item = queue.lease('a', 1, 60)[0]
+            assert item.key == '1'
+            assert queue.fail('a', item, 'error')
+            assert queue.connection.execute(
+                'SELECT status FROM items WHERE id = ?', (item.id,)
+            ).fetchone() == (status,)
+
+
+def test_expired_lease_at_max_attempts_fails(tmp_path: Path) -> None:
+    with make_queue(tmp_path, max_attempts=1) as queue:
+        item = queue.lease('a', 1, -1)[0]
+
+        assert queue.lease('b', 2, 60)[0].key == '2'
+        assert queue.counts() == {'failed': 1, 'leased': 1}
+        assert not queue.complete('a', item)
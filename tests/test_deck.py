@@ -0,0 +1,134 @@
+from collections import Counter
+from random import Random
+
+from deck import (
+    CommanderIndex,
+    DeckConstraints,
+    DeckGenerator,
+    GroupKey,
+    PoolCard,
+    get_color_mask,
+)
+
+
+def make_card(
+    name: str,
+    cmc: int = 1,
+    maintype: str = 'creature',
+    identity: str = 'W',
+    cardtype: str = 'Creature — Test',
+) -> PoolCard:
+    return PoolCard(
+        name=name,
+        type=cardtype,
+        rulestext='',
+        manacost=f'{{{cmc}}}',
+        coloridentity=identity,
+        color_mask=get_color_mask(identity),
+        cmc=cmc,
+        maintype=maintype,
+        pips=(0.0,) * 6,
+    )
+
+
+def make_generator(cards: list[PoolCard], commander: PoolCard) -> DeckGenerator:
+    commanders = CommanderIndex(cards)
+    commanders.commander_options = [commander]
+    return DeckGenerator(cards, commanders)
+
+
+def test_commander_excluded_by_identity() -> None:
+    commander = make_card('Commander', cardtype='Legendary Creature — Test')
+    twin = PoolCard(*commander)
+    others = [make_card(f'Card {i}') for i in range(58)]
+    generator = make_generator([commander, twin, *others], commander)
+
+    for seed in range(20):
+        commanders, chosen_cards, _ = generator.draw_deck(Random(seed))
+        assert commanders == [commander]
+        assert len(chosen_cards) == 59
+        assert not any(card is commander for card in chosen_cards)
+        assert any(card is twin for card in chosen_cards)
+
+
+def test_pool_just_large_enough() -> None:
+    commander = make_card('Commander', cardtype='Legendary Creature — Test')
+    others = [make_card(f'Card {i}', identity='') for i in range(59)]
+    generator = make_generator(others, commander)
+
+    _, chosen_cards, _ = generator.draw_deck(Random(0))
+    assert sorted(card.name for card in chosen_cards) == sorted(
+        card.name for card in others
+    )
+
+
+def make_feasible_targets(
+    rng: Random, amount: int
+) -> tuple[DeckConstraints, dict[GroupKey, int]]:
+    rows = [1, 2, 3, 4, None]
+    columns = ['creature', 'instant', None]
+    capacity = {
+        (row, column): rng.randrange(4, 15) for row in rows for column in columns
+    }
+    slots = [key for key, size in capacity.items() for _ in range(size)]
+    counts = Counter(rng.sample(slots, amount))
+
+    curve = {row: 0 for row in rows if row is not None}
+    types = {column: 0 for column in columns if column is not None}
+    for (row, column), count in counts.items():
+        if row is not None:
+            curve[row] += count
+        if column is not None:
+            types[column] += count
+    return DeckConstraints(curve, types), capacity
+
+
+def test_allocation_meets_feasible_targets() -> None:
+    rng = Random(0)
+    for _ in range(500):
+        constraints, capacity = make_feasible_targets(rng, 59)
+        generator = DeckGenerator([], CommanderIndex([]), constraints)
+        counts, shortfall = generator.allocate_groups(rng, 59, capacity)
+
+        assert shortfall == 0
+        assert all(0 <= count <= capacity[key] for key, count in counts.items())
+        for row, target in constraints.curve.items():
+            assert sum(n for (cmc, _), n in counts.items() if cmc == row) == target
+        for column, target in constraints.types.items():
+            assert sum(n for (_, kind), n in counts.items() if kind == column) == target
+        assert sum(counts.values()) == 59
+
+
+def test_constrained_deck_hits_targets() -> None:
+    commander = make_card('Commander', cardtype='Legendary Creature — Test')
+    cards = [commander] + [
+        make_card(f'{maintype} {cmc} {i}', cmc, maintype)
+        for cmc in range(1, 8)
+        for maintype in ('creature', 'instant', 'sorcery')
+        for i in range(6)
+    ]
+    generator = make_generator(cards, commander)
+    generator.constraints = DeckConstraints(
+        {1: 6, 2: 10, 3: 10, 5: 2}, {'creature': 25, 'instant': 6}
+    )
+
+    for seed in range(50):
+        _, chosen_cards, _ = generator.draw_deck(Random(seed))
+        assert len(chosen_cards) == 59
+        assert not any(card is commander for card in chosen_cards)
+        curve = Counter(card.cmc for card in chosen_cards)
+        types = Counter(card.maintype for card in chosen_cards)
+        assert [curve[1], curve[2], curve[3], curve[5]] == [6, 10, 10, 2]
+        assert [types['creature'], types['instant']] == [25, 6]
+
+
+def test_changing_constraints_resets_groups() -> None:
+    commander = make_card('Commander', cardtype='Legendary Creature — Test')
+    cards = [make_card(f'Card {i}', i % 3) for i in range(30)]
+    generator = make_generator(cards, commander)
+
+    generator.constraints = DeckConstraints({1: 5}, {})
+    assert set(generator.legal_groups(1)) == {(1, None), (None, None)}
+
+    generator.constraints = DeckConstraints({}, {'creature': 5})
+    assert set(generator.legal_groups(1)) == {(None, 'creature')}
@@ -0,0 +1,53 @@
+from copy import deepcopy
+
+from dedup import MinHashIndex, find_duplicates
+from synthetic import CorpusGenerator
+from type_classes import Card
+
+
+def make_copy(card: Card, card_id: str, name: str, rules: str | None = None) -> Card:
+    copy = deepcopy(card)
+    copy['info']['id'] = card_id
+    copy['info']['user_id'] = card_id
+    copy['data']['text']['title']['text'] = name
+    if rules is not None:
+        copy['data']['text']['rules']['text'] = rules
+    return copy
+
+
+def test_renamed_near_duplicate_is_merged() -> None:
+    _, user_cards = CorpusGenerator(0).generate_user(12)
+    card = user_cards['5']
+    renamed = make_copy(
+        card,
+        '100',
+        'Draithmor, the Gilded Drake',
+        card['data']['text']['rules']['text'].replace('Vigilance', 'Vigilance.'),
+    )
+
+    clusters = find_duplicates([*user_cards.values(), renamed])
+
+    assert [
+        (cluster['canonical']['id'], [entry['id'] for entry in cluster['duplicates']])
+        for cluster in clusters
+    ] == [('5', ['100'])]
+    assert clusters[0]['duplicates'][0]['similarity'] >= 0.8
+
+
+def test_same_text_under_another_name_is_kept() -> None:
+    _, user_cards = CorpusGenerator(0).generate_user(12)
+    reprint = make_copy(user_cards['5'], '100', 'Sunforged Wyrm')
+
+    assert not find_duplicates([*user_cards.values(), reprint])
+
+
+def test_crowded_bucket_pairs_are_bounded() -> None:
+    index = MinHashIndex()
+    for key in range(100):
+        index.add(key, frozenset([1, 2, 3]))
+
+    pairs = index.candidate_pairs(window=4)
+
+    assert len(pairs) == 4 * 100 - (1 + 2 + 3 + 4)
+    assert all(0 < second - first <= 4 for first, second in pairs)
+    assert len(index.candidate_pairs(window=200)) == 100 * 99 // 2
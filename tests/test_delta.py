@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from delta import (
+    apply_delta,
+    compare_manifests,
+    create_manifest,
+    load_database,
+    write_database,
+    write_delta,
+)
+from xmlbackend import Element, SubElement
+
+
+def make_set(name: str) -> Element:
+    set_element = Element('set')
+    SubElement(set_element, 'name').text = name
+    SubElement(set_element, 'longname').text = name
+    return set_element
+
+
+def make_card(name: str, text: str, set_name: str = 'S') -> Element:
+    card = Element('card')
+    SubElement(card, 'name').text = name
+    SubElement(card, 'text').text = text
+    SubElement(card, 'set').text = set_name
+    return card
+
+
+def round_trip(
+    tmp_path: Path, old_cards: list[Element], new_cards: list[Element]
+) -> Path:
+    old_path, new_path = tmp_path / 'old.xml', tmp_path / 'new.xml'
+    write_database(old_path, [make_set('S')], old_cards)
+    write_database(new_path, [make_set('S'), make_set('T')], new_cards)
+
+    database = load_database(new_path)
+    manifest = create_manifest(database)
+    delta = compare_manifests(create_manifest(load_database(old_path)), manifest)
+    write_delta(tmp_path / 'delta', database, manifest, delta)
+
+    patched_path = tmp_path / 'patched.xml'
+    assert apply_delta(old_path, tmp_path / 'delta', patched_path)
+    assert create_manifest(load_database(patched_path)) == manifest
+    return patched_path
+
+
+def test_changed_duplicate_keeps_its_key(tmp_path: Path) -> None:
+    round_trip(
+        tmp_path,
+        [make_card('A', 'one'), make_card('A', 'two'), make_card('B', 'b')],
+        [make_card('A', 'one'), make_card('A', 'changed'), make_card('B', 'b')],
+    )
+
+
+def test_added_and_removed_duplicates(tmp_path: Path) -> None:
+    round_trip(
+        tmp_path,
+        [make_card('A', 'one'), make_card('A', 'two'), make_card('B', 'b')],
+        [
+            make_card('A', 'two'),
+            make_card('B', 'b'),
+            make_card('B', 'second b'),
+            make_card('C', 'c', 'T'),
+        ],
+    )
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from frontier import CrawlFrontier
+from synthetic import CorpusGenerator
+from type_classes import CardInfo
+
+
+def observe_users(frontier: CrawlFrontier, likes: dict[str, int]) -> None:
+    _, user_cards = CorpusGenerator(0).generate_user(1)
+    template = next(iter(user_cards.values()))['info']
+
+    infos: list[CardInfo] = []
+    for user_id, amount in likes.items():
+        info = template.copy()
+        info['id'] = f'{user_id}-1'
+        info['user_id'] = user_id
+        info['likes'] = str(amount)
+        infos.append(info)
+    frontier.observe(infos)
+
+
+def test_pop_follows_the_score() -> None:
+    frontier = CrawlFrontier()
+    observe_users(frontier, {'1': 0, '2': 50, '3': 5})
+
+    assert [frontier.pop(), frontier.pop(), frontier.pop(), frontier.pop()] == [
+        '2',
+        '3',
+        '1',
+        None,
+    ]
+
+
+def test_crawled_users_are_skipped_until_stale() -> None:
+    frontier = CrawlFrontier(recrawl_after=60)
+    observe_users(frontier, {'1': 0, '2': 50})
+    frontier.mark_crawled(['2'])
+
+    assert frontier.pop() == '1'
+    assert frontier.pop() is None
+    observe_users(frontier, {'2': 50})
+    assert frontier.pop() is None
+
+    frontier.crawled['2'] -= 120
+    observe_users(frontier, {'2': 50})
+    assert frontier.pop() == '2'
+
+
+def test_popping_does_not_mark_a_user_crawled() -> None:
+    frontier = CrawlFrontier()
+    observe_users(frontier, {'1': 0})
+
+    assert frontier.pop() == '1'
+    assert not frontier.is_fresh('1')
+    assert '1' in frontier.users
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    path = tmp_path / 'frontier.json'
+    frontier = CrawlFrontier(path)
+    observe_users(frontier, {'1': 0, '2': 50, '3': 5})
+    frontier.mark_crawled(['2'])
+    assert frontier.next_page(10) == 1
+    frontier.save()
+
+    loaded = CrawlFrontier(path)
+    assert loaded.users == frontier.users
+    assert loaded.crawled == frontier.crawled
+    assert loaded.page == 2
+    assert [loaded.pop(), loaded.pop()] == ['3', '1']
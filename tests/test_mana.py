@@ -0,0 +1,58 @@
+import pytest
+
+from mana import parse_mana_cost
+
+
+@pytest.mark.parametrize(
+    ('mana_cost', 'kinds', 'text', 'cmc', 'pips'),
+    [
+        ('3WW', ['generic', 'colored', 'colored'], '3WW', 5, (2, 0, 0, 0, 0, 0)),
+        ('{10}{G}', ['generic', 'colored'], '10G', 11, (0, 0, 0, 0, 1, 0)),
+        ('{C}', ['colorless'], 'C', 1, (0, 0, 0, 0, 0, 1)),
+        ('{S}{S}', ['snow', 'snow'], 'SS', 2, (0, 0, 0, 0, 0, 0)),
+        ('{X}RR', ['variable', 'colored', 'colored'], 'XRR', 2, (0, 0, 0, 2, 0, 0)),
+        ('{w/u}', ['hybrid'], '{W/U}', 1, (0.5, 0.5, 0, 0, 0, 0)),
+        ('{U/W}', ['hybrid'], '{W/U}', 1, (0.5, 0.5, 0, 0, 0, 0)),
+        ('{2/w}', ['twobrid'], '{2/W}', 2, (0.5, 0, 0, 0, 0, 0)),
+        ('{W2}', ['twobrid'], '{2/W}', 2, (0.5, 0, 0, 0, 0, 0)),
+        ('{B/P}', ['phyrexian'], '{B/P}', 1, (0, 0, 0.5, 0, 0, 0)),
+        ('{PB}', ['phyrexian'], '{B/P}', 1, (0, 0, 0.5, 0, 0, 0)),
+        (
+            '{rwp}',
+            ['hybrid_phyrexian'],
+            '{R/W/P}',
+            1,
+            (1 / 3, 0, 0, 1 / 3, 0, 0),
+        ),
+        (
+            '{G/U/P}',
+            ['hybrid_phyrexian'],
+            '{G/U/P}',
+            1,
+            (0, 1 / 3, 0, 0, 1 / 3, 0),
+        ),
+        ('{W/W}', ['other'], '{W/W}', 0, (0, 0, 0, 0, 0, 0)),
+        ('', [], '', 0, (0, 0, 0, 0, 0, 0)),
+    ],
+)
+def test_parse_mana_cost(
+    mana_cost: str,
+    kinds: list[str],
+    text: str,
+    cmc: int,
+    pips: tuple[float, ...],
+) -> None:
+    cost = parse_mana_cost(mana_cost)
+
+    assert [symbol.kind for symbol in cost.symbols] == kinds
+    assert cost.text == text
+    assert cost.cmc == cmc
+    assert cost.pips == pytest.approx(pips)
+
+
+def test_pips_add_up_across_symbols() -> None:
+    cost = parse_mana_cost('{2}{B/G}{B/G}{B/P}{R/W/P}')
+
+    assert cost.cmc == 6
+    assert cost.colors == 'WBRG'
+    assert cost.pips == pytest.approx((1 / 3, 0, 1.5, 1 / 3, 1, 0))
@@ -0,0 +1,61 @@
+from asyncio import run
+from hashlib import sha256
+from pathlib import Path
+
+from aiohttp.test_utils import TestServer
+
+from mirror import ImageMirror, get_image_urls
+from standin import IMAGE_PATH, StandInServer
+from synthetic import CorpusGenerator
+
+
+async def mirror_from_standin(mirror: ImageMirror, urls: list[str]) -> int:
+    user_id, user_cards = CorpusGenerator(0).generate_user(1)
+    async with TestServer(StandInServer({user_id: user_cards}).create_app()) as server:
+        mirror.source_url = str(server.make_url(IMAGE_PATH))
+        return await mirror.mirror(urls)
+
+
+def test_mirror_from_standin(tmp_path: Path) -> None:
+    user_id, user_cards = CorpusGenerator(0).generate_user(3)
+    first, second, third = user_cards.values()
+    third['info']['image_url'] = first['info']['image_url'].replace(
+        '/builder/', '/copies/'
+    )
+    urls = get_image_urls({user_id: user_cards})
+    assert len(urls) == 3
+
+    mirror = ImageMirror(str(tmp_path / 'images'))
+    assert run(mirror_from_standin(mirror, urls)) == 3
+
+    for url in urls:
+        name = mirror.index[url]
+        content = (mirror.directory / name).read_bytes()
+        digest = sha256(content).hexdigest()
+        assert name == f'objects/{digest[:2]}/{digest}.png'
+    assert mirror.index[first['info']['image_url']] == mirror.index[urls[2]]
+    assert mirror.index[second['info']['image_url']] != mirror.index[urls[2]]
+    assert len(list((mirror.directory / 'objects').glob('*/*'))) == 2
+
+    reloaded = ImageMirror(str(tmp_path / 'images'))
+    assert reloaded.index == mirror.index
+    assert run(mirror_from_standin(reloaded, urls)) == 0
+
+    reloaded.rewrite_image_urls(user_cards.values(), 'https://cdn.example.com/')
+    assert second['info']['image_url'] == (
+        f'https://cdn.example.com/{mirror.index[urls[1]]}'
+    )
+    assert third['info']['image_url'] == first['info']['image_url']
+
+
+def test_rewrite_keeps_unmirrored_urls(tmp_path: Path) -> None:
+    user_id, user_cards = CorpusGenerator(0).generate_user(2)
+    urls = get_image_urls({user_id: user_cards})
+
+    mirror = ImageMirror(str(tmp_path / 'images'))
+    mirror.store_image(urls[0], b'image', 'image/png')
+    mirror.rewrite_image_urls(user_cards.values(), 'images')
+
+    first, second = user_cards.values()
+    assert first['info']['image_url'] == f'images/{mirror.index[urls[0]]}'
+    assert second['info']['image_url'] == urls[1]
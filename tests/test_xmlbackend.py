@@ -0,0 +1,11 @@
+from xmlbackend import Element, SubElement, serialize
+
+
+def test_serialize_keeps_the_element_unchanged() -> None:
+    root = Element('card')
+    SubElement(root, 'name').text = 'Sol Ring'
+    SubElement(root, 'related')
+
+    assert serialize(root) == '<card><name>Sol Ring</name><related></related></card>'
+    assert root.text is None
+    assert root[1].text is None
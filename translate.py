@@ -1,13 +1,31 @@
-import json
 import re
+from argparse import ArgumentParser
 from collections.abc import Callable
+from contextlib import ExitStack
 from difflib import get_close_matches
-from xml.etree.ElementTree import Element, SubElement, fromstring, indent, tostring
+from pathlib import Path
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from typing import IO, NamedTuple
+from zlib import crc32
 
 import requests
 from tqdm import tqdm
 
-from type_classes import Card, TextSettings
+from archive import load_corpus
+from cardstore import CardStore
+from mana import parse_mana_cost
+from mirror import ImageMirror
+from profiler import profiler
+from type_classes import Card, CardInfo, TextSettings
+from xmlbackend import (
+    XML_DECLARATION,
+    Element,
+    SubElement,
+    fromstring,
+    indent,
+    serialize,
+)
 
 
 class TranslationError(Exception):
@@ -33,6 +51,7 @@ def add_set(sets: Element, card: Card) -> str:
         set_name = 'MCB-' + set_name
 
     if not set_exists(sets, set_name):
+        profiler.count('sets_created')
         set_element = SubElement(sets, 'set')
 
         name = SubElement(set_element, 'name')
@@ -184,187 +203,237 @@ def translate_text(text: str, card: Card) -> str:
 
     for pattern, replace in replace_options:
         regex = re.compile(pattern, re.IGNORECASE)
-        result = re.sub(regex, replace, result)
+        result, substitutions = re.subn(regex, replace, result)
+        profiler.count('regex_substitutions', substitutions)
 
     result: str = re.split(r'\{(divider|flavor)\}', result, 1, re.IGNORECASE)[0]
 
     return result
 
 
-def add_card(
-    cards: Element,
-    card: Card,
-    set_name: str,
-    user_cards: dict[str, Card],
-    back_side: Card | None,
-    is_back_side: bool,
-    tokens: dict[str, str],
-) -> None:
-    card_element = SubElement(cards, 'card')
-
-    name = SubElement(card_element, 'name')
-    name.text = get_card_name(card)
+RARITIES = {'c': 'common', 'u': 'uncommon', 'r': 'rare', 'm': 'mythic'}
+MAINTYPES = (
+    'instant',
+    'sorcery',
+    'creature',
+    'planeswalker',
+    'battle',
+    'land',
+    'artifact',
+    'enchantment',
+    'hero',
+)
+IGNORED_SUPERTYPES = ('basic', 'host', 'legendary', 'ongoing', 'snow', 'token', 'world')
+BASIC_LAND_TYPES = ('forest', 'island', 'mountain', 'plains', 'swamp')
+TABLEROWS = {
+    'land': '0',
+    'artifact': '1',
+    'enchantment': '1',
+    'planeswalker': '1',
+    'creature': '2',
+    'instant': '3',
+    'sorcery': '3',
+}
+MAINTYPE_TABLEROWS = {
+    card_type.capitalize(): tablerow for card_type, tablerow in TABLEROWS.items()
+}
+CIPT_TEXT = ' enters the battlefield tapped'
+COLOR_SYMBOL_PATTERN = re.compile(r'\{([WUBRG])\}')
+
+
+class CardFeatures(NamedTuple):
+    name: str
+    text: str
+    layout: str
+    type: str
+    card_types: list[str]
+    maintype: str | None
+    manacost: str | None
+    cmc: int
+    colors: str
+    identity: str
+    pt: str | None
+    loyalty: str | None
+    rarity: str | None
+    number: str | None
+    tablerow: str
+    cipt: bool
+    is_token: bool
+
+
+def get_maintype(type_line: str, card_types: list[str], name: str) -> str | None:
+    for card_type in MAINTYPES:
+        if card_type in card_types:
+            return card_type.capitalize()
+
+    if not card_types and any(
+        land_type in name.lower() for land_type in BASIC_LAND_TYPES
+    ):
+        return 'land'
 
-    text = get_text(card)
-    SubElement(card_element, 'text').text = text
+    return next(
+        (
+            card_type
+            for card_type in type_line.split()
+            if card_type.lower() not in IGNORED_SUPERTYPES
+        ),
+        None,
+    )
 
-    card_types: list[str] = []
 
-    if 'type' in card['data']['text']:
-        match = re.match(
-            r'([a-zA-Z ]+?)(-|\{-}|$)',
-            translate_text(card['data']['text']['type']['text'], card),
-        )
+def get_tablerow(maintype: str | None, category: str, card_types: list[str]) -> str:
+    if maintype in MAINTYPE_TABLEROWS:
+        return MAINTYPE_TABLEROWS[maintype]
+    if category in TABLEROWS:
+        return TABLEROWS[category]
+    if 'creature' in card_types:
+        return '2'
+    if 'land' in card_types:
+        return '0'
+    return '1'
 
-        if match:
-            card_types = match[1].lower().split()
 
-    prop = SubElement(card_element, 'prop')
+def get_rarity(card: Card) -> str | None:
+    rarity = card['data']['info']['rarity']
+    if rarity in RARITIES:
+        return RARITIES[rarity.lower()]
 
-    layout = SubElement(prop, 'layout')
+    if card['data']['set_symbol'] is not None:
+        match = re.search(r'-(.)\.svg$', card['data']['set_symbol'])
+        if match:
+            return RARITIES[match[1]]
+    return None
 
-    if card['data']['version'] == 'adventure':
-        layout.text = 'adventure'
-    elif card['data']['version'] == 'planechase':
-        layout.text = 'planar'
-    elif any(
-        string in get_text(card).lower()
-        for string in ('transform', 'daybound', 'nightbound')
-    ):
-        layout.text = 'transform'
-    else:
-        layout.text = 'normal'
 
-    side = SubElement(prop, 'side')
+def is_cipt(name: str, text: str) -> bool:
+    suffixes = (name.lower(), 'this creature', 'this card')
+    index = text.find(CIPT_TEXT)
+    while index != -1:
+        if text.endswith(suffixes, 0, index):
+            return True
+        index = text.find(CIPT_TEXT, index + 1)
+    return False
 
-    if is_back_side:
-        side.text = 'back'
-    else:
-        side.text = 'front'
 
-    type_element = SubElement(prop, 'type')
-    type_element.text = translate_text(card['data']['text']['type']['text'], card)
+def extract_features(card: Card) -> CardFeatures:
+    data = card['data']
+    texts = data['text']
 
-    if layout.text == 'adventure':
-        type_element.text = (
-            translate_text(card['data']['text']['type2']['text'], card)
-            + ' // '
-            + type_element.text
-        )
+    name = get_card_name(card)
+    text = get_text(card)
+    lower_text = text.lower()
 
-    maintype = SubElement(prop, 'maintype')
-    card_types = type_element.text.lower().split()
-
-    if 'instant' in card_types:
-        maintype.text = 'Instant'
-    elif 'sorcery' in card_types:
-        maintype.text = 'Sorcery'
-    elif 'creature' in card_types:
-        maintype.text = 'Creature'
-    elif 'planeswalker' in card_types:
-        maintype.text = 'Planeswalker'
-    elif 'battle' in card_types:
-        maintype.text = 'Battle'
-    elif 'land' in card_types:
-        maintype.text = 'Land'
-    elif 'artifact' in card_types:
-        maintype.text = 'Artifact'
-    elif 'enchantment' in card_types:
-        maintype.text = 'Enchantment'
-    elif 'hero' in card_types:
-        maintype.text = 'Hero'
-    elif not card_types and any(
-        land_type in get_card_name(card).lower()
-        for land_type in ('forest', 'island', 'mountain', 'plains', 'swamp')
+    if data['version'] == 'adventure':
+        layout = 'adventure'
+    elif data['version'] == 'planechase':
+        layout = 'planar'
+    elif any(
+        string in lower_text for string in ('transform', 'daybound', 'nightbound')
     ):
-        maintype.text = 'land'
+        layout = 'transform'
     else:
-        try:
-            maintype.text = [
-                card_type
-                for card_type in type_element.text.split()
-                if card_type.lower()
-                not in (
-                    'basic',
-                    'host',
-                    'legendary',
-                    'ongoing',
-                    'snow',
-                    'token',
-                    'world',
-                )
-            ][0]
-        except IndexError:
-            prop.remove(maintype)
+        layout = 'normal'
 
-    cmc = 0
-    manacost: Element | None = None
-    if 'mana' in card['data']['text']:
-        cost, cmc = translate_mana_cost(card['data']['text']['mana']['text'], card)
+    type_line = translate_text(texts['type']['text'], card)
+    if layout == 'adventure':
+        type_line = translate_text(texts['type2']['text'], card) + ' // ' + type_line
+    card_types = type_line.lower().split()
 
+    cmc = 0
+    manacost: str | None = None
+    if 'mana' in texts:
+        cost, cmc = translate_mana_cost(texts['mana']['text'], card)
         if cost:
-            manacost = SubElement(prop, 'manacost')
-            manacost.text = cost
-
-            if layout.text == 'adventure':
-                manacost.text = (
-                    translate_mana_cost(card['data']['text']['mana2']['text'], card)[0]
+            manacost = cost
+            if layout == 'adventure':
+                manacost = (
+                    translate_mana_cost(texts['mana2']['text'], card)[0]
                     + ' // '
-                    + manacost.text
+                    + manacost
                 )
 
-    SubElement(prop, 'cmc').text = str(cmc)
+    frame_names = {frame['name'] for frame in data['frames']}
+    rules_symbols: set[str] = set()
+    for text_type, settings in texts.items():
+        if text_type.startswith('rules'):
+            rules_symbols.update(COLOR_SYMBOL_PATTERN.findall(settings['text'].upper()))
 
+    cost_letters = set((manacost or '').upper())
     colors = ''
-    identity_colors = ''
+    identity = ''
     for letter, color_name in color_names.items():
-        if (manacost is not None and letter in (manacost.text or '').upper()) or (
-            any(
-                frame['name'] == f'{color_name} Pip' for frame in card['data']['frames']
-            )
-        ):
+        if letter in cost_letters or f'{color_name} Pip' in frame_names:
             colors += letter
-            identity_colors += letter
-
-        elif any(
-            text_type.startswith('rules') and '{' + letter + '}' in text['text'].upper()
-            for text_type, text in card['data']['text'].items()
-        ):
-            identity_colors += letter
-
-    if colors:
-        SubElement(prop, 'colors').text = colors
-    if identity_colors:
-        SubElement(prop, 'coloridentity').text = identity_colors
-
-    if card['data']['text'].get('pt', {'text': ''})['text']:
-        SubElement(prop, 'pt').text = translate_text(
-            card['data']['text']['pt']['text'], card
-        ).strip()
-
-    if card['data']['text'].get('loyalty', {'text': ''})['text']:
-        SubElement(prop, 'loyalty').text = translate_text(
-            card['data']['text']['loyalty']['text'], card
-        )
+            identity += letter
+        elif letter in rules_symbols:
+            identity += letter
+
+    pt = texts.get('pt', {'text': ''})['text']
+    loyalty = texts.get('loyalty', {'text': ''})['text']
+    number = re.match(r'(\d+)(/\d+)?$', data['info']['number'])
+    maintype = get_maintype(type_line, card_types, name)
+
+    return CardFeatures(
+        name=name,
+        text=text,
+        layout=layout,
+        type=type_line,
+        card_types=card_types,
+        maintype=maintype,
+        manacost=manacost,
+        cmc=cmc,
+        colors=colors,
+        identity=identity,
+        pt=translate_text(pt, card).strip() if pt else None,
+        loyalty=translate_text(loyalty, card) if loyalty else None,
+        rarity=None if 'token' in card_types else get_rarity(card),
+        number=number[1] if number else None,
+        tablerow=get_tablerow(maintype, card['info']['category'], card_types),
+        cipt=is_cipt(name, lower_text),
+        is_token=card['info']['category'] == 'token'
+        or 'token' in texts.get('type', {'text': ''})['text'].lower().split(),
+    )
 
-    set_element = SubElement(card_element, 'set', picurl=card['info']['image_url'])
-    set_element.text = set_name
 
-    rarities = {'c': 'common', 'u': 'uncommon', 'r': 'rare', 'm': 'mythic'}
+def add_card(
+    cards: Element,
+    card: Card,
+    set_name: str,
+    user_cards: dict[str, Card],
+    back_side: Card | None,
+    is_back_side: bool,
+    tokens: dict[str, str],
+) -> None:
+    features = extract_features(card)
 
-    if 'token' not in card_types:
-        if card['data']['info']['rarity'] in rarities:
-            set_element.attrib['rarity'] = rarities[
-                card['data']['info']['rarity'].lower()
-            ]
-        elif card['data']['set_symbol'] is not None:
-            match = re.search(r'-(.)\.svg$', card['data']['set_symbol'])
-            if match:
-                set_element.attrib['rarity'] = rarities[match[1]]
+    card_element = SubElement(cards, 'card')
+    SubElement(card_element, 'name').text = features.name
+    SubElement(card_element, 'text').text = features.text
+
+    prop = SubElement(card_element, 'prop')
+    SubElement(prop, 'layout').text = features.layout
+    SubElement(prop, 'side').text = 'back' if is_back_side else 'front'
+    SubElement(prop, 'type').text = features.type
+    if features.maintype is not None:
+        SubElement(prop, 'maintype').text = features.maintype
+    if features.manacost is not None:
+        SubElement(prop, 'manacost').text = features.manacost
+    SubElement(prop, 'cmc').text = str(features.cmc)
+    if features.colors:
+        SubElement(prop, 'colors').text = features.colors
+    if features.identity:
+        SubElement(prop, 'coloridentity').text = features.identity
+    if features.pt is not None:
+        SubElement(prop, 'pt').text = features.pt
+    if features.loyalty is not None:
+        SubElement(prop, 'loyalty').text = features.loyalty
 
-    match = re.match(r'(\d+)(/\d+)?$', card['data']['info']['number'])
-    if match:
-        set_element.attrib['num'] = match[1]
+    set_element = SubElement(card_element, 'set', picurl=card['info']['image_url'])
+    set_element.text = set_name
+    if features.rarity is not None:
+        set_element.attrib['rarity'] = features.rarity
+    if features.number is not None:
+        set_element.attrib['num'] = features.number
 
     if back_side is not None:
         for string in ('related', 'reverse-related'):
@@ -372,90 +441,52 @@ def add_card(
                 back_side
             )
 
-    if layout.text == 'adventure':
+    if features.layout == 'adventure':
         SubElement(card_element, 'related', attach='attach').text = 'On an Adventure'
 
-    rules = get_text(card).lower()
+    rules = features.text.lower()
     added_tokens: list[str] = []
     for token_string, token_name in tokens.items():
         if token_string in rules and token_name not in added_tokens:
             added_tokens.append(token_name)
             SubElement(card_element, 'related', count='x').text = token_name
+            profiler.count('tokens_linked')
 
-    for match in re.findall(r'.+ creature token .+', get_text(card).lower()):
+    for match in re.findall(r'.+ creature token .+', rules):
         tqdm.write(match)
 
-    if (
-        card['info']['category'] == 'token'
-        or 'token'
-        in card['data']['text'].get('type', {'text': ''})['text'].lower().split()
-    ):
+    if features.is_token:
         for creating_card in user_cards.values():
-            if name.text in get_text(creating_card):
+            if features.name in get_text(creating_card):
+                profiler.count('tokens_linked')
                 SubElement(card_element, 'reverse-related', count='x').text = (
                     get_card_name(creating_card)
                 )
 
         SubElement(card_element, 'token').text = '1'
 
-    tablerow = SubElement(card_element, 'tablerow')
-    match maintype.text:
-        case 'Land':
-            tablerow.text = '0'
-        case 'Artifact' | 'Enchantment' | 'Planeswalker':
-            tablerow.text = '1'
-        case 'Creature':
-            tablerow.text = '2'
-        case 'Instant' | 'Sorcery':
-            tablerow.text = '3'
-        case _:
-            match card['info']['category']:
-                case 'land':
-                    tablerow.text = '0'
-                case 'artifact' | 'enchantment' | 'planeswalker':
-                    tablerow.text = '1'
-                case 'creature':
-                    tablerow.text = '2'
-                case 'instant' | 'sorcery':
-                    tablerow.text = '3'
-                case _:
-                    if 'creature' in card_types:
-                        tablerow.text = '2'
-                    elif 'land' in card_types:
-                        tablerow.text = '0'
-                    else:
-                        tablerow.text = '1'
-
-    if any(
-        f'{s.lower()} enters the battlefield tapped' in text.lower()
-        for s in (name.text, 'this creature', 'this card')
-    ):
+    SubElement(card_element, 'tablerow').text = features.tablerow
+
+    if features.cipt:
         SubElement(card_element, 'cipt').text = '1'
 
     # SubElement(card_element, 'upsidedown').text = '1'
 
 
 def translate_mana_cost(mana_cost: str, card: Card) -> tuple[str, int]:
-    costs: list[str] = [
-        (
-            cost
-            if len(cost) <= 1 or cost.isnumeric()
-            else translate_text('{' + cost + '}', card)
-        )
-        for cost in re.split(r'[ {}]', mana_cost.upper())
-    ]
-
-    cmc = 0
+    cost = parse_mana_cost(mana_cost)
 
-    for cost in costs:
-        if cost.isnumeric():
-            cmc += int(cost)
-        elif '2' in cost:
-            cmc += 2
-        elif cost:
-            cmc += 1
-
-    return ''.join(costs), cmc
+    return (
+        ''.join(
+            (
+                translate_text(symbol.text, card)
+                if symbol.kind == 'other' and symbol.text.startswith('{')
+                else symbol.text
+            )
+            for symbol in cost.symbols
+        ),
+        cost.cmc,
+    )
 
 
 def get_card_name(card: Card, rules_cardname: bool = False) -> str:
@@ -472,7 +503,7 @@ def get_card_name(card: Card, rules_cardname: bool = False) -> str:
     )
 
 
-def main():
+def get_reference_card_names() -> list[str]:
     card_names: list[str] = requests.get(
         'https://api.scryfall.com/catalog/card-names', timeout=10
     ).json()['data']
@@ -481,28 +512,39 @@ def main():
         if ' // ' in name:
             card_names += name.split(' // ')
 
-    tokens = {
-        'blood token': 'Blood Token',
-        'clue token': 'Clue Token',
-        'food token': 'Food Token',
-        'gold token': 'Gold Token',
-        'incubator token': 'Incubator Token',
-        'junk token': 'Junk Token',
-        'map token': 'Map Token',
-        'powerstone token': 'Powerstone Token',
-        'treasure token': 'Treasure Token',
-        'shard token': 'Shard Token',
-        'walker token': 'Walker Token',
-        'daybound': 'Day',
-    }
-
-    tokens_xml = fromstring(
-        requests.get(
-            'https://raw.githubusercontent.com/Cockatrice/Magic-Token/master/tokens.xml',
-            timeout=10,
-        ).text
+    return card_names
+
+
+BASE_TOKENS = {
+    'blood token': 'Blood Token',
+    'clue token': 'Clue Token',
+    'food token': 'Food Token',
+    'gold token': 'Gold Token',
+    'incubator token': 'Incubator Token',
+    'junk token': 'Junk Token',
+    'map token': 'Map Token',
+    'powerstone token': 'Powerstone Token',
+    'treasure token': 'Treasure Token',
+    'shard token': 'Shard Token',
+    'walker token': 'Walker Token',
+    'daybound': 'Day',
+}
+
+
+def get_tokens() -> dict[str, str]:
+    return parse_tokens(
+        fromstring(
+            requests.get(
+                'https://raw.githubusercontent.com/Cockatrice/Magic-Token/master/tokens.xml',
+                timeout=10,
+            ).text
+        )
     )
 
+
+def parse_tokens(tokens_xml: Element) -> dict[str, str]:
+    tokens = dict(BASE_TOKENS)
+
     for token in tokens_xml.iter('card'):
         name = token.find('name')
         if name is None or name.text is None:
@@ -569,103 +611,122 @@ def main():
         tokens[token_string.lower()] = name.text
         tokens[tokens_string.lower()] = name.text
 
-    with open('cards.json', encoding='utf-8') as file:
-        data: dict[str, dict[str, Card]] = json.load(file)
+    return tokens
 
-    root = Element('cockatrice_carddatabase', version='4')
 
-    root.attrib['xmlns:xsi'] = 'http://www.w3.org/2001/XMLSchema-instance'
-    schema = (
-        'https://raw.githubusercontent.com/Cockatrice'
-        '/Cockatrice/master/doc/carddatabase_v4/cards.xsd'
+def is_original_info(info: CardInfo) -> bool:
+    if info['visual_type'] != 'custom':
+        return False
+    return info['category'] not in ['token', 'other']
+
+
+def is_original_card(card: Card, card_names: list[str]) -> bool:
+    return (
+        is_original_info(card['info'])
+        and 'type' in card['data']['text']
+        and 'token' not in card['data']['text']['type']['text'].lower().split()
+        and (
+            card['info']['category'] == 'planeswalker'
+            or (
+                'rules' in card['data']['text']
+                and card['data']['text']['rules']['text'] != ''
+            )
+        )
+        and len(get_close_matches(get_card_name(card), card_names, cutoff=0.9)) == 0
     )
-    root.attrib['xsi:noNamespaceSchemaLocation'] = schema
 
+
+def has_original_cards(user_cards: dict[str, Card], card_names: list[str]) -> bool:
+    for i, card in enumerate(tqdm(user_cards.values(), 'Cards', leave=None)):
+        if is_original_card(card, card_names):
+            tqdm.write(get_card_name(card))
+            return True
+
+        if i > 20:
+            break
+
+    return False
+
+
+def get_dfcs(user_cards: dict[str, Card]) -> dict[str, str]:
+    dfcs: dict[str, str] = {}
+    for card in user_cards.values():
+        card_text = get_text(card).lower()
+        options: list[Card] = []
+
+        if 'nightbound' not in card_text:
+            if 'daybound' in card_text:
+                for nightbound in user_cards.values():
+                    if (
+                        'nightbound' in get_text(nightbound).lower()
+                        and nightbound != card
+                    ):
+                        options.append(nightbound)
+
+                if not options:
+                    pass
+
+            elif 'transform' in card_text:
+                for back in user_cards.values():
+                    if 'transform' in back['data']['version'].lower() and back != card:
+                        options.append(back)
+
+                if not options:
+                    pass
+
+        if options:
+            options = [
+                option
+                for option in options
+                if get_card_name(option).split()[0] == get_card_name(card).split()[0]
+            ] or options
+
+            options = [
+                option
+                for option in options
+                if option['data']['text']['pt']['text']
+                == card['data']['text']['reminder']['text']
+            ] or options
+
+            options = [
+                option
+                for option in options
+                if option['data']['text']['type']['text'].split('-')[0]
+                == card['data']['text']['type']['text'].split('-')[0]
+            ] or options
+
+            assert len(options) == 1
+            dfcs[card['info']['id']] = options[0]['info']['id']
+
+    return dfcs
+
+
+SCHEMA_INSTANCE = 'http://www.w3.org/2001/XMLSchema-instance'
+SCHEMA_LOCATION = (
+    'https://raw.githubusercontent.com/Cockatrice'
+    '/Cockatrice/master/doc/carddatabase_v4/cards.xsd'
+)
+DATABASE_START = (
+    f'<cockatrice_carddatabase version="4" xmlns:xsi="{SCHEMA_INSTANCE}" '
+    f'xsi:noNamespaceSchemaLocation="{SCHEMA_LOCATION}">'
+)
+
+
+def create_database() -> tuple[Element, Element, Element]:
+    root = Element('cockatrice_carddatabase', version='4')
     sets = SubElement(root, 'sets')
     cards = SubElement(root, 'cards')
 
-    for user, user_cards in tqdm(data.items(), 'Users'):
-        has_original_cards = False
-        for i, card in enumerate(tqdm(user_cards.values(), 'Cards', leave=None)):
-            if (
-                card['info']['visual_type'] == 'custom'
-                and card['info']['category'] not in ['token', 'other']
-                and 'type' in card['data']['text']
-                and 'token' not in card['data']['text']['type']['text'].lower().split()
-                and (
-                    card['info']['category'] == 'planeswalker'
-                    or (
-                        'rules' in card['data']['text']
-                        and card['data']['text']['rules']['text'] != ''
-                    )
-                )
-                and len(get_close_matches(get_card_name(card), card_names, cutoff=0.9))
-                == 0
-            ):
-                tqdm.write(get_card_name(card))
-                has_original_cards = True
-                break
-
-            if i > 20:
-                break
-
-        if not has_original_cards:
-            tqdm.write(f'skipping user {user}')
-            continue
+    return root, sets, cards
 
-        dfcs: dict[str, str] = {}
-        for card in user_cards.values():
-            card_text = get_text(card).lower()
-            options: list[Card] = []
-
-            if 'nightbound' not in card_text:
-                if 'daybound' in card_text:
-                    for nightbound in user_cards.values():
-                        if (
-                            'nightbound' in get_text(nightbound).lower()
-                            and nightbound != card
-                        ):
-                            options.append(nightbound)
-
-                    if not options:
-                        pass
-
-                elif 'transform' in card_text:
-                    for back in user_cards.values():
-                        if (
-                            'transform' in back['data']['version'].lower()
-                            and back != card
-                        ):
-                            options.append(back)
-
-                    if not options:
-                        pass
-
-            if options:
-                options = [
-                    option
-                    for option in options
-                    if get_card_name(option).split()[0]
-                    == get_card_name(card).split()[0]
-                ] or options
-
-                options = [
-                    option
-                    for option in options
-                    if option['data']['text']['pt']['text']
-                    == card['data']['text']['reminder']['text']
-                ] or options
-
-                options = [
-                    option
-                    for option in options
-                    if option['data']['text']['type']['text'].split('-')[0]
-                    == card['data']['text']['type']['text'].split('-')[0]
-                ] or options
-
-                assert len(options) == 1
-                dfcs[card['info']['id']] = options[0]['info']['id']
 
+def add_user_cards(
+    sets: Element, cards: Element, user_cards: dict[str, Card], tokens: dict[str, str]
+) -> None:
+    with profiler.phase('dfc_pairing'):
+        dfcs = get_dfcs(user_cards)
+
+    with profiler.phase('add_card'):
         for card in user_cards.values():
             set_name = add_set(sets, card)
             add_card(
@@ -681,18 +742,194 @@ def main():
                 card['info']['id'] in dfcs.values(),
                 tokens,
             )
+            profiler.count('cards_translated')
+
+
+def serialize_card(card: Element) -> str:
+    card.tail = None
+    indent(card, level=2)
+    return serialize(card)
+
+
+class DatabaseWriter:
+    path: str
+    root: Element
+    sets: Element
+    cards: Element
+    spool: IO[str]
+    written: int
+
+    def __init__(self, path: str | Path = '01.customcards.xml') -> None:
+        self.path = str(path)
+        self.root, self.sets, self.cards = create_database()
+        self.spool = TemporaryFile('w+', encoding='utf-8')
+        self.written = 0
+
+    def __enter__(self) -> 'DatabaseWriter':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.spool.close()
+
+    def add_sets(self, sets: Element) -> None:
+        for set_element in sets:
+            if not set_exists(self.sets, set_element.findtext('name', '')):
+                self.sets.append(set_element)
+
+    def flush_cards(self) -> None:
+        with profiler.phase('serialization'):
+            self.add_serialized_cards([serialize_card(card) for card in self.cards])
+            self.cards.clear()
+
+    def add_serialized_cards(self, cards: list[str]) -> None:
+        for card in cards:
+            self.spool.write('\n    ' + card)
+        self.written += len(cards)
+
+    def finish(self) -> None:
+        self.flush_cards()
+
+        with profiler.phase('indent'):
+            self.sets.tail = None
+            indent(self.sets, level=1)
+
+        with profiler.phase('serialization'):
+            with open(self.path, 'w', encoding='utf-8') as file:
+                file.write(f'{XML_DECLARATION}{DATABASE_START}\n  ')
+                file.write(serialize(self.sets) + '\n  ')
+
+                if self.written:
+                    file.write('<cards>')
+                    self.spool.seek(0)
+                    copyfileobj(self.spool, file)
+                    file.write('\n  </cards>')
+                else:
+                    file.write('<cards></cards>')
 
-    indent(root)
+                file.write('\n</cockatrice_carddatabase>')
 
-    with open('01.customcards.xml', 'w', encoding='utf-8') as file:
-        file.write(
-            tostring(
-                root,
-                encoding='unicode',
-                xml_declaration=True,
-                short_empty_elements=False,
+
+def get_shard_name(user_id: str, shard_by: str, shards: int) -> str:
+    if shard_by == 'user':
+        return f'01.mcb-user-{user_id}.xml'
+    return f'01.mcb-group-{crc32(user_id.encode("utf-8")) % shards:03}.xml'
+
+
+def get_group_user_ids(
+    store: CardStore, user_ids: list[str] | None, since: float | None, shards: int
+) -> list[str]:
+    changed = user_ids or store.user_ids(since)
+    groups = {get_shard_name(user_id, 'group', shards) for user_id in changed}
+    return [
+        user_id
+        for user_id in store.user_ids()
+        if get_shard_name(user_id, 'group', shards) in groups
+    ]
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--report', default='translate_report.json')
+    parser.add_argument('--profile')
+    parser.add_argument('--store')
+    parser.add_argument('--users', nargs='+')
+    parser.add_argument('--since', type=float)
+    parser.add_argument('--corpus', default='cards.json')
+    parser.add_argument('--output', default='01.customcards.xml')
+    parser.add_argument('--images')
+    parser.add_argument('--image-base-url')
+    parser.add_argument('--image-thumbnail', type=int)
+    parser.add_argument('--shard-by', choices=['user', 'group'])
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--shard-directory', default='customsets')
+    args = parser.parse_args()
+
+    profiler.reset()
+    if args.profile:
+        profiler.start_profile()
+
+    with profiler.phase('reference_download'):
+        card_names = get_reference_card_names()
+        tokens = get_tokens()
+
+    store = CardStore(args.store) if args.store else None
+    with profiler.phase('load_cards'):
+        if store is None:
+            data = load_corpus(args.corpus)
+            users = iter(data.items())
+            total = len(data)
+        else:
+            user_ids = args.users
+            if args.shard_by == 'group' and (args.users or args.since is not None):
+                user_ids = get_group_user_ids(
+                    store, args.users, args.since, args.shards
+                )
+            users = store.iter_users(user_ids, args.since if user_ids is None else None)
+            total = None
+
+    mirror = ImageMirror(args.images) if args.images else None
+    image_base_url = args.image_base_url or (
+        Path(args.images).resolve().as_uri() if args.images else ''
+    )
+
+    shard_directory = Path(args.shard_directory)
+    if args.shard_by is not None:
+        shard_directory.mkdir(parents=True, exist_ok=True)
+
+    with ExitStack() as stack:
+        writers: dict[Path, DatabaseWriter] = {}
+
+        for user, user_cards in tqdm(users, 'Users', total):
+            if args.shard_by is None:
+                path = Path(args.output)
+            else:
+                path = shard_directory / get_shard_name(
+                    user, args.shard_by, args.shards
+                )
+
+            if args.shard_by != 'user' and path not in writers:
+                writers[path] = stack.enter_context(DatabaseWriter(path))
+
+            if mirror is not None:
+                mirror.rewrite_image_urls(
+                    user_cards.values(), image_base_url, args.image_thumbnail
+                )
+
+            with profiler.phase('originality'):
+                original = has_original_cards(user_cards, card_names)
+
+            if not original:
+                tqdm.write(f'skipping user {user}')
+                profiler.count('users_skipped')
+                if args.shard_by == 'user':
+                    path.unlink(missing_ok=True)
+                continue
+
+            if args.shard_by == 'user':
+                with DatabaseWriter(path) as writer:
+                    add_user_cards(writer.sets, writer.cards, user_cards, tokens)
+                    writer.finish()
+            else:
+                writer = writers[path]
+                add_user_cards(writer.sets, writer.cards, user_cards, tokens)
+                writer.flush_cards()
+
+        if args.shard_by is None and not writers:
+            writers[Path(args.output)] = stack.enter_context(
+                DatabaseWriter(args.output)
             )
-        )
+        for writer in writers.values():
+            writer.finish()
+
+    if store is not None:
+        store.close()
+
+    if args.profile:
+        profiler.stop_profile(args.profile)
+    profiler.write_report(args.report)
 
 
 color_names = {'W': 'White', 'U': 'Blue', 'B': 'Black', 'R': 'Red', 'G': 'Green'}
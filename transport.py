@@ -0,0 +1,79 @@
+import json
+from typing import Any, Protocol
+
+from aiohttp import ClientSession
+
+API_URL = 'https://mtgcardbuilder.com/wp-admin/admin-ajax.php'
+
+
+class Transport(Protocol):
+    async def post(self, method: str, params: dict[str, Any]) -> bytes: ...
+
+    async def close(self) -> None: ...
+
+
+class HttpTransport:
+    url: str
+    session: ClientSession
+
+    def __init__(self, url: str = API_URL) -> None:
+        self.url = url
+        self.session = ClientSession()
+
+    async def post(self, method: str, params: dict[str, Any]) -> bytes:
+        async with self.session.post(
+            self.url,
+            data={'action': 'builder_ajax', 'method': method, **params},
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+        ) as response:
+            return await response.read()
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def get_cassette_key(method: str, params: dict[str, Any]) -> str:
+    return json.dumps([method, sorted(params.items())])
+
+
+class RecordingTransport:
+    transport: Transport
+    path: str
+    cassette: dict[str, str]
+
+    def __init__(self, transport: Transport, path: str) -> None:
+        self.transport = transport
+        self.path = path
+        self.cassette = {}
+
+    async def post(self, method: str, params: dict[str, Any]) -> bytes:
+        body = await self.transport.post(method, params)
+        self.cassette[get_cassette_key(method, params)] = body.decode('utf-8')
+        return body
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump(self.cassette, file, indent=2)
+
+
+class ReplayTransport:
+    cassette: dict[str, str]
+
+    def __init__(self, path: str) -> None:
+        with open(path, encoding='utf-8') as file:
+            self.cassette = json.load(file)
+
+    async def post(self, method: str, params: dict[str, Any]) -> bytes:
+        try:
+            return self.cassette[get_cassette_key(method, params)].encode('utf-8')
+        except KeyError as err:
+            raise CassetteMiss(method, params) from err
+
+    async def close(self) -> None:
+        pass
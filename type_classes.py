@@ -29,6 +29,11 @@ class GetGalleryOptions(GetGalleryGlobalOptions, total=False):
     user_id: str | None
 
 
+class SearchGalleryOptions(TypedDict, total=False):
+    search: str | None
+    tag: str | None
+
+
 class CardInfo(TypedDict):
     artist_name: Literal['']
     card_edition: str
@@ -104,3 +109,6 @@ class CardData(TypedDict):
 class Card(TypedDict):
     info: CardInfo
     data: CardData
+
+
+type Corpus = dict[str, dict[str, Card]]
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import re
+from argparse import ArgumentParser
+from collections import Counter
+from multiprocessing import Pool
+from pathlib import Path
+from typing import NamedTuple, TypedDict
+
+from tqdm import tqdm
+
+from deck import (
+    BASIC_LANDS,
+    DeckGenerator,
+    PoolCard,
+    classify_commander,
+    get_color_mask,
+)
+
+DECK_SIZE = 100
+LINE_PATTERN = re.compile(r'(SB:\s*)?(\d+)\s+(.+)')
+BASIC_LAND_MASKS = {
+    name.lower(): get_color_mask(color) for color, name in BASIC_LANDS.items()
+}
+
+
+class DeckEntry(NamedTuple):
+    name: str
+    amount: int
+    commander: bool
+
+
+class DeckReport(TypedDict):
+    path: str
+    valid: bool
+    cards: int
+    commanders: list[str]
+    invalid_commanders: list[str]
+    unknown: list[str]
+    off_color: list[str]
+    duplicates: list[str]
+    malformed_lines: list[int]
+
+
+def parse_deck(text: str) -> tuple[list[DeckEntry], list[int]]:
+    entries: list[DeckEntry] = []
+    malformed_lines: list[int] = []
+
+    for i, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+
+        if (match := LINE_PATTERN.fullmatch(line)) is None:
+            malformed_lines.append(i)
+            continue
+        entries.append(DeckEntry(match[3].strip(), int(match[2]), match[1] is not None))
+
+    return entries, malformed_lines
+
+
+class DeckValidator:
+    cards_by_name: dict[str, PoolCard]
+    masks_by_name: dict[str, set[int]]
+
+    def __init__(self, cards: list[PoolCard]) -> None:
+        self.cards_by_name = {}
+        self.masks_by_name = {name: {mask} for name, mask in BASIC_LAND_MASKS.items()}
+
+        for card in cards:
+            name = card.name.lower()
+            self.masks_by_name.setdefault(name, set()).add(card.color_mask)
+            if name not in self.cards_by_name or (
+                classify_commander(self.cards_by_name[name]) is None
+                and classify_commander(card) is not None
+            ):
+                self.cards_by_name[name] = card
+
+    @classmethod
+    def from_file(
+        cls, path: str | Path = '01.customcards.xml', use_snapshot: bool = True
+    ) -> DeckValidator:
+        return cls(DeckGenerator.from_file(path, use_snapshot).cards)
+
+    def check_commanders(self, commanders: list[PoolCard]) -> list[str]:
+        kinds = [classify_commander(commander) for commander in commanders]
+        if len(commanders) == 1 and kinds[0] is not None:
+            return []
+        if len(commanders) == 2 and all(
+            kind is not None and kind[0] != 'normal' for kind in kinds
+        ):
+            return []
+        return [
+            commander.name
+            for commander, kind in zip(commanders, kinds)
+            if kind is None or len(commanders) != 1
+        ]
+
+    def validate(self, text: str, path: str = '') -> DeckReport:
+        entries, malformed_lines = parse_deck(text)
+
+        commanders: list[PoolCard] = []
+        unknown: list[str] = []
+        color_mask = 0
+        for entry in entries:
+            if not entry.commander:
+                continue
+            if (card := self.cards_by_name.get(entry.name.lower())) is None:
+                unknown.append(entry.name)
+                continue
+            commanders.append(card)
+            color_mask |= card.color_mask
+
+        off_color: list[str] = []
+        amounts: Counter[str] = Counter()
+        names: dict[str, str] = {}
+        for entry in entries:
+            key = entry.name.lower()
+            amounts[key] += entry.amount
+            names.setdefault(key, entry.name)
+            if entry.commander:
+                continue
+
+            if (masks := self.masks_by_name.get(key)) is None:
+                unknown.append(entry.name)
+            elif all(mask & ~color_mask for mask in masks):
+                off_color.append(entry.name)
+
+        invalid_commanders = self.check_commanders(commanders)
+        duplicates = [
+            names[key]
+            for key, amount in amounts.items()
+            if amount > 1 and key not in BASIC_LAND_MASKS
+        ]
+        cards = sum(amounts.values())
+
+        return {
+            'path': path,
+            'valid': cards == DECK_SIZE
+            and bool(commanders)
+            and not (
+                invalid_commanders
+                or unknown
+                or off_color
+                or duplicates
+                or malformed_lines
+            ),
+            'cards': cards,
+            'commanders': [entry.name for entry in entries if entry.commander],
+            'invalid_commanders': invalid_commanders,
+            'unknown': list(dict.fromkeys(unknown)),
+            'off_color': list(dict.fromkeys(off_color)),
+            'duplicates': duplicates,
+            'malformed_lines': malformed_lines,
+        }
+
+    def validate_file(self, path: str | Path) -> DeckReport:
+        with open(path, encoding='utf-8') as file:
+            return self.validate(file.read(), str(path))
+
+    def validate_directory(
+        self, directory: str | Path, processes: int = 1
+    ) -> list[DeckReport]:
+        paths = [str(path) for path in sorted(Path(directory).rglob('*.dec'))]
+
+        if processes == 1:
+            return [
+                self.validate_file(path) for path in tqdm(paths, 'Decks', leave=None)
+            ]
+
+        chunksize = max(1, min(256, len(paths) // (processes * 4)))
+        with Pool(processes, initializer=init_worker, initargs=(self,)) as pool:
+            return list(
+                tqdm(
+                    pool.imap(validate_in_worker, paths, chunksize),
+                    'Decks',
+                    len(paths),
+                    leave=None,
+                )
+            )
+
+
+worker_validator: DeckValidator | None = None  # pylint: disable=invalid-name
+
+
+def init_worker(validator: DeckValidator) -> None:
+    global worker_validator  # pylint: disable=global-statement
+    worker_validator = validator
+
+
+def validate_in_worker(path: str) -> DeckReport:
+    assert worker_validator is not None
+    return worker_validator.validate_file(path)
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('directory')
+    parser.add_argument('--database', default='01.customcards.xml')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--report', default='deck_report.json')
+    args = parser.parse_args()
+
+    validator = DeckValidator.from_file(args.database)
+    reports = validator.validate_directory(args.directory, args.processes)
+
+    with open(args.report, 'w', encoding='utf-8') as file:
+        json.dump(reports, file, indent=2, ensure_ascii=False)
+
+    problems: Counter[str] = Counter()
+    for report in reports:
+        if report['cards'] != DECK_SIZE:
+            problems['card count'] += 1
+        for key in (
+            'invalid_commanders',
+            'unknown',
+            'off_color',
+            'duplicates',
+            'malformed_lines',
+        ):
+            if report[key]:
+                problems[key.replace('_', ' ')] += 1
+
+    invalid = sum(not report['valid'] for report in reports)
+    print(f'{len(reports) - invalid} of {len(reports)} decks valid')
+    for problem, amount in problems.most_common():
+        print(f'  {amount} with {problem}')
+
+
+if __name__ == '__main__':
+    main()
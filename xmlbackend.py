@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+from xml.etree import ElementTree
+
+try:
+    if os.environ.get('CUSTOM_MTG_XML') == 'stdlib':
+        raise ImportError
+    from lxml import etree  # type: ignore
+except ImportError:
+    etree = None
+
+LXML = etree is not None
+XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>\n"
+
+if TYPE_CHECKING or etree is None:
+    Element = ElementTree.Element
+    SubElement = ElementTree.SubElement
+    indent = ElementTree.indent
+else:
+    Element = etree.Element
+    SubElement = etree.SubElement
+    indent = etree.indent
+
+
+def fromstring(text: str | bytes) -> Element:
+    if etree is None:
+        return ElementTree.fromstring(text)
+
+    if isinstance(text, str):
+        text = text.encode('utf-8')
+    return etree.fromstring(text, etree.XMLParser(huge_tree=True))
+
+
+def parse(path: str | Path) -> Element:
+    if etree is None:
+        with open(path, encoding='utf-8') as file:
+            return ElementTree.parse(file).getroot()
+
+    return etree.parse(str(path), etree.XMLParser(huge_tree=True)).getroot()
+
+
+def serialize(element: Element) -> str:
+    if etree is None:
+        return ElementTree.tostring(
+            element, encoding='unicode', short_empty_elements=False
+        )
+
+    empty = [
+        child for child in element.iter() if child.text is None and len(child) == 0
+    ]
+    for child in empty:
+        child.text = ''
+    try:
+        return etree.tostring(element, encoding='unicode')
+    finally:
+        for child in empty:
+            child.text = None
+
+
+def remove_namespaces(root: Element) -> None:
+    for key in [key for key in root.attrib if key.startswith('{')]:
+        del root.attrib[key]
+
+    if etree is not None:
+        etree.cleanup_namespaces(root)